@@ -1,6 +1,6 @@
 import streamlit as st
 from services.admin import admin_dashboard
-from services.database import initialize_default_users, initialize_database_if_needed
+from services.database import bootstrap_database
 from services.siedbar_layout import login, logout
 
 # ----------------------------
@@ -67,13 +67,11 @@ def main():
 
     st.set_page_config(page_title="IVET Data Management", page_icon="📊")
     st.markdown("<h2 style='text-align: center;'>IVET DATA MANAGEMENT</h2>", unsafe_allow_html=True)
-    # Initialisiere DB bei Bedarf
-    db_was_initialized = initialize_database_if_needed()
+    # Initialisiere DB bei Bedarf (einmal pro Prozess, inkl. Standard-Admin)
+    db_was_initialized = bootstrap_database()
     if db_was_initialized:
         st.toast("📦 Database has been reinitialized")
         st.info("💡 The database has been freshly created and is ready.")
-        initialize_default_users()
-     # Check/create admin user
 
     # Check login
     if not st.session_state.get("logged_in", False):
@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
 import datetime
-from services.database import save_sample_data, fetch_all_samples
-from services.generate_id import generate_sample_id
+from services.database import (
+    register_sample, register_samples, fetch_samples_page, fetch_projects, fetch_sample_ids,
+    count_samples, iter_samples, unit_of_work
+)
+from services.labels import format_sample_label, label_file_name, write_label_archive
+from services.sample_batch import read_sample_sheet, validate_sample_sheet, mapping_sheet, is_valid_prefix, PREFIX_MESSAGE
+from services.siedbar_layout import paged_query, date_range_filter
 
 # -------------------------------
 # Login-Check
@@ -39,6 +44,9 @@ def register_sample_dialog():
 
             if submitted:
                 errors = []
+                prefix = prefix.strip()
+                if not is_valid_prefix(prefix):
+                    errors.append(PREFIX_MESSAGE)
                 if not sample_type or len(sample_type.strip()) < 3:
                     errors.append("Sample Type must contain at least 3 characters.")
                 if not responsible or len(responsible.strip()) < 3:
@@ -49,26 +57,22 @@ def register_sample_dialog():
                         st.error(e)
                     return
 
-                sample_id = generate_sample_id(prefix)
                 registration_date = datetime.datetime.now().date()
 
-                success = save_sample_data(
-                    sample_id, sample_type, project, registration_date,
+                # ID-Vergabe und Speichern in einer Transaktion
+                sample_id = register_sample(
+                    prefix, sample_type, project, registration_date,
                     sampling_date, location, condition, responsible
                 )
 
-                if success:
+                if sample_id:
                     st.session_state.sample_registered = True
                     st.session_state.sample_id = sample_id
-                    st.session_state.sample_label_text = f"""
-                                                **Sample ID**: `{sample_id}`  
-                                                **Type**: `{sample_type}`  
-                                                **Project**: `{project}`  
-                                                **Sampling Date**: `{sampling_date}`  
-                                                **Location**: `{location}`  
-                                                **Condition**: `{condition}`  
-                                                **Responsible**: `{responsible}`  
-                                                """
+                    st.session_state.sample_label_text = format_sample_label({
+                        "sample_id": sample_id, "sample_type": sample_type, "project": project,
+                        "sampling_date": sampling_date, "sampling_location": location,
+                        "sample_condition": condition, "responsible_person": responsible
+                    })
                 else:
                     st.error("❌ Sample could not be registered.")
     else:
@@ -80,6 +84,57 @@ def register_sample_dialog():
         if st.download_button("⬇️ Download Label & Enter", st.session_state.sample_label_text, file_name=f"{st.session_state.sample_id}_label.txt"):
             st.session_state.sample_registered = False
             st.rerun()
+
+# -------------------------------
+# Dialog: Sammel-Registrierung aus CSV/Excel
+# -------------------------------
+if "batch_mapping" not in st.session_state:
+    st.session_state.batch_mapping = None
+
+@st.dialog("Register Samples from Sheet", width="large")
+def register_samples_batch_dialog():
+    if st.session_state.batch_mapping is None:
+        st.caption(
+            "Columns: `sample_type`, `responsible_person` (required), `prefix`, `project`, "
+            "`sampling_date`, `sampling_location`, `sample_condition`"
+        )
+        default_prefix = st.text_input("Default Sample ID Prefix", "ABC")
+        uploaded = st.file_uploader("Sample sheet", type=["csv", "xlsx"], key="batch_sheet")
+        if uploaded is None:
+            return
+
+        try:
+            sheet = read_sample_sheet(uploaded)
+        except Exception as e:
+            st.error(f"❌ {e}")
+            return
+
+        clean, errors = validate_sample_sheet(sheet, default_prefix=default_prefix)
+        if not errors.empty:
+            st.error(f"❌ {errors['row'].nunique()} of {len(clean)} rows are invalid – nothing was registered.")
+            st.dataframe(errors, hide_index=True)
+            return
+
+        st.success(f"✅ {len(clean)} rows are valid.")
+        st.dataframe(clean, hide_index=True)
+
+        if st.button(f"Register {len(clean)} Samples"):
+            sample_ids = register_samples(clean)
+            if sample_ids is None:
+                st.error("❌ Samples could not be registered.")
+                return
+            st.session_state.batch_mapping = clean.assign(sample_id=sample_ids)
+            st.rerun(scope="fragment")
+    else:
+        mapping = st.session_state.batch_mapping
+        st.success(f"✅ {len(mapping)} samples have been registered!")
+        st.dataframe(mapping[["row", "sample_id", "sample_type", "project"]], hide_index=True)
+        if st.download_button(
+            "⬇️ Download Sample ID Mapping", mapping_sheet(mapping), file_name="sample_id_mapping.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        ):
+            st.session_state.batch_mapping = None
+            st.rerun()
 # -------------------------------
 # Button zentriert + Styling
 # -------------------------------
@@ -110,94 +165,118 @@ st.markdown(
 if st.button("➕ Register New Sample"):
     register_sample_dialog()
 
-# Fehlerbehandlung für Datenabruf
-try:
-    all_samples_data = fetch_all_samples()
+if st.button("📄 Register Samples from Sheet"):
+    register_samples_batch_dialog()
 
-    # Überprüfen, ob Daten existieren
-    if all_samples_data is None or all_samples_data.empty:
-        st.warning("⚠️ No ELTRA TGA data found in the database.")
-        data = pd.DataFrame()  # Leerer DataFrame, wenn keine Daten vorhanden sind
-    else:
-        # Filter anzeigen, auch wenn keine Daten existieren
-        st.sidebar.header("Filter and Download Options")
+# Alle Lesezugriffe in einer Session und Transaktion; Registrierung und st.rerun() liegen außerhalb
+with unit_of_work():
+    # Fehlerbehandlung für Datenabruf
+    try:
+        sample_count = fetch_samples_page(page_size=1)[1]
 
-        # Projektfilter
-        proj_tga = all_samples_data['project'].dropna().unique().tolist()
-        proj = st.sidebar.selectbox("Project", [""] + proj_tga)
+        # Überprüfen, ob Daten existieren
+        if sample_count == 0:
+            st.warning("⚠️ No ELTRA TGA data found in the database.")
+            data = pd.DataFrame()  # Leerer DataFrame, wenn keine Daten vorhanden sind
+        else:
+            # Filter anzeigen, auch wenn keine Daten existieren
+            st.sidebar.header("Filter and Download Options")
 
-        # Filter anwenden, wenn Projekt ausgewählt
-        filtered_data = all_samples_data[all_samples_data['project'] == proj] if proj else all_samples_data
+            # Projektfilter
+            proj_tga = fetch_projects()
+            proj = st.sidebar.selectbox("Project", [""] + proj_tga)
 
-        # Sample ID Filter
-        sample_options = filtered_data['sample_id'].dropna().unique().tolist()
-        sample_id = st.sidebar.selectbox("Sample ID", [""] + sample_options)
+            # Sample ID Filter
+            sample_options = fetch_sample_ids(project=proj or None)
+            sample_id = st.sidebar.selectbox("Sample ID", [""] + sample_options)
 
-        # Filter anwenden, wenn Sample ID ausgewählt
-        if sample_id:
-            filtered_data = filtered_data[filtered_data['sample_id'] == sample_id]
+            # Registrierungszeitraum
+            date_from, date_to = date_range_filter("Registration date", key="samples_date_range")
 
-        # Anzeige der gefilterten Daten oder der Warnung
-        if filtered_data.empty:
-            st.warning("⚠️ No data available for the selected filter.")
-        else:
-            st.markdown("<h2 style='text-align: center;'>Registered Samples</h2>", unsafe_allow_html=True)
-            st.dataframe(filtered_data, height=400)
-
-        # Wenn eine Sample ID ausgewählt wurde, anzeigen und Download ermöglichen
-        if sample_id:
-            # Nur wenn die sample_id gültig ist, sample_row definieren
-            sample_row = filtered_data[filtered_data['sample_id'] == sample_id].iloc[0]
-            label_text = f"""
-            **Sample ID**: `{sample_row['sample_id'] if 'sample_id' in sample_row else 'N/A'}`  
-            **Type**: `{sample_row['sample_type'] if 'sample_type' in sample_row else 'N/A'}`  
-            **Project**: `{sample_row['project'] if 'project' in sample_row else 'N/A'}`  
-            **Sampling Date**: `{sample_row['sampling_date'] if 'sampling_date' in sample_row else 'N/A'}`  
-            **Location**: `{sample_row['sampling_location'] if 'sampling_location' in sample_row else 'N/A'}`  
-            **Condition**: `{sample_row['sample_condition'] if 'sample_condition' in sample_row else 'N/A'}`  
-            **Responsible**: `{sample_row['responsible_person'] if 'responsible_person' in sample_row else 'N/A'}`
-            """
-            file_name = f"{sample_row['sample_id']}_label.txt"  # Gültigen Dateinamen setzen
-            ID = f"Download Label {file_name}"
-        else:
-            label_text = "No sample selected. Please choose a Sample ID to download the label."
-            file_name = "NO_label.txt"  # Default-Dateiname, wenn keine Sample ID gewählt wurde
-            ID = "Select ID for Download"
-
-        # Immer den Download-Button anzeigen, aber den Download nur aktivieren, wenn file_name gültig ist
-        if file_name != "NO_label.txt":
-            st.sidebar.download_button(
-                label=f"⬇️ {ID}",
-                data=label_text,
-                file_name=f"{file_name if file_name else 'sample_label.txt'}"
-                # Default-Dateiname, wenn keine Sample ID gewählt wurde
-            )
-        else:
-            # Button immer anzeigen, aber keinen Download ermöglichen, wenn keine Sample ID ausgewählt wurde
-            st.markdown(
-                f"""
-                    <style>
-                    .stButton button {{
-                        background-color: #f0f0f5;
-                        border: 1px solid #d6d6d6;
-                        color: black;
-                        width: 100%;
-                        padding: 10px 20px;
-                        border-radius: 5px;
-                        font-size: 16px;
-                        font-weight: 500;
-                        transition: background-color 0.3s ease;
-                    }}
-                    .stButton button:hover {{
-                        background-color: #e1e1eb;
-                        border-color: #c0c0c8;
-                        color: black;
-                    }}
-                    </style>
-                    """, unsafe_allow_html=True
+            # Filter in der Datenbank anwenden – es wird nur eine Seite geladen
+            filtered_data, _ = paged_query(
+                fetch_samples_page, key="samples", project=proj or None, sample_id=sample_id or None,
+                date_from=date_from, date_to=date_to
             )
-            st.sidebar.button(f"⬇️ {ID}", disabled=True)  # Zeigt den Button an, aber er ist inaktiv
 
-except Exception as e:
-    st.error(f"❌ Error fetching data from database: {e}")
-    all_samples_data = pd.DataFrame()  # Leerer DataFrame, wenn ein Fehler auftritt
\ No newline at end of file
+            # Anzeige der gefilterten Daten oder der Warnung
+            if filtered_data.empty:
+                st.warning("⚠️ No data available for the selected filter.")
+            else:
+                st.markdown("<h2 style='text-align: center;'>Registered Samples</h2>", unsafe_allow_html=True)
+                st.dataframe(filtered_data, height=400)
+
+            # Wenn eine Sample ID ausgewählt wurde, anzeigen und Download ermöglichen
+            if sample_id:
+                # Nur wenn die sample_id gültig ist, sample_row definieren
+                sample_row = filtered_data[filtered_data['sample_id'] == sample_id].iloc[0]
+                label_text = format_sample_label(sample_row.where(sample_row.notna(), None))
+                file_name = label_file_name(sample_row)  # Gültigen Dateinamen setzen
+                ID = f"Download Label {file_name}"
+            else:
+                label_text = "No sample selected. Please choose a Sample ID to download the label."
+                file_name = "NO_label.txt"  # Default-Dateiname, wenn keine Sample ID gewählt wurde
+                ID = "Select ID for Download"
+
+            # Immer den Download-Button anzeigen, aber den Download nur aktivieren, wenn file_name gültig ist
+            if file_name != "NO_label.txt":
+                st.sidebar.download_button(
+                    label=f"⬇️ {ID}",
+                    data=label_text,
+                    file_name=f"{file_name if file_name else 'sample_label.txt'}"
+                    # Default-Dateiname, wenn keine Sample ID gewählt wurde
+                )
+            else:
+                # Button immer anzeigen, aber keinen Download ermöglichen, wenn keine Sample ID ausgewählt wurde
+                st.markdown(
+                    f"""
+                        <style>
+                        .stButton button {{
+                            background-color: #f0f0f5;
+                            border: 1px solid #d6d6d6;
+                            color: black;
+                            width: 100%;
+                            padding: 10px 20px;
+                            border-radius: 5px;
+                            font-size: 16px;
+                            font-weight: 500;
+                            transition: background-color 0.3s ease;
+                        }}
+                        .stButton button:hover {{
+                            background-color: #e1e1eb;
+                            border-color: #c0c0c8;
+                            color: black;
+                        }}
+                        </style>
+                        """, unsafe_allow_html=True
+                )
+                st.sidebar.button(f"⬇️ {ID}", disabled=True)  # Zeigt den Button an, aber er ist inaktiv
+
+            # Massen-Export: alle Labels eines Projekts oder sample_id-Bereichs als ZIP bzw. Sammeldatei
+            with st.sidebar.expander("🏷️ Bulk Label Export"):
+                label_project = st.selectbox("Project", [""] + proj_tga, key="labels_project")
+                id_from = st.text_input("Sample ID from", key="labels_id_from").strip()
+                id_to = st.text_input("Sample ID to", key="labels_id_to").strip()
+                combined = st.radio("Format", ["ZIP (one file per label)", "One printable file"],
+                                    key="labels_format") != "ZIP (one file per label)"
+
+                selection = {"project": label_project or None, "sample_id_from": id_from or None,
+                             "sample_id_to": id_to or None}
+                label_count = count_samples(**selection) if any(selection.values()) else 0
+                st.caption(f"{label_count} labels selected")
+
+                def build_labels():
+                    # Läuft erst beim Klick auf den Download – die Samples werden dabei gestreamt
+                    output, _ = write_label_archive(iter_samples(**selection), combined=combined)
+                    with output:
+                        return output.read()
+
+                st.download_button(
+                    "⬇️ Download Labels", data=build_labels, disabled=label_count == 0,
+                    file_name="sample_labels.txt" if combined else "sample_labels.zip",
+                    mime="text/plain" if combined else "application/zip"
+                )
+
+    except Exception as e:
+        st.error(f"❌ Error fetching data from database: {e}")
+        filtered_data = pd.DataFrame()  # Leerer DataFrame, wenn ein Fehler auftritt
\ No newline at end of file
@@ -1,9 +1,10 @@
 
 import streamlit as st
 import pandas as pd
-import io
-from services.eltra_tga_processing import check_required_tga_headers, tga_process_uploaded_file
-from services.database import save_dataframe_to_tga_table,fetch_all_eltra_tga_data
+from services.batch_upload import parse_uploaded_files, manifest_entries
+from services.database import fetch_ingest_manifest, save_dataframe_to_tga_table, fetch_eltra_tga_data_page, fetch_projects, fetch_sample_ids, iter_eltra_tga_data, fetch_tga_statistics, unit_of_work
+from services.export import excel_download, csv_download, XLSX_MIME, CSV_MIME
+from services.siedbar_layout import paged_query, skip_ingested_files, date_range_filter
 
 # Login prüfen
 if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
@@ -16,72 +17,80 @@ if 'tga_data' not in st.session_state:
 
 st.set_page_config(page_title="ELTRA TGA Analysis", page_icon="🔥", layout="wide")
 
-# Datei-Upload
-uploaded_file = st.file_uploader("Upload ELTRA TGA files", type=["txt", "csv"], accept_multiple_files=False)
+# Datei-Upload (mehrere Dateien möglich, z. B. alle Messungen eines Tages)
+uploaded_files = st.file_uploader("Upload ELTRA TGA files", type=["txt", "csv"], accept_multiple_files=True)
 
-# Datei-Verarbeitung
-if uploaded_file:
-
-    file_name = uploaded_file.name
+# Datei-Verarbeitung: alle Dateien parallel parsen und zu einem deduplizierten DataFrame zusammenführen
+if uploaded_files:
     try:
-        content = uploaded_file.read().decode("utf-8")
-
-        if not check_required_tga_headers(content):
-            st.error(f"❌ Invalid headers in {file_name}")
+        # Bereits importierte Dateien über das Manifest erkennen – vor jedem Parsen
+        uploaded_files = skip_ingested_files(uploaded_files)
 
+        df_tga, upload_status = parse_uploaded_files("tga", uploaded_files)
 
-        df_tga = tga_process_uploaded_file(content)
-        if df_tga is None:
-            st.error(f"⚠️ Could not process {file_name}")
+        failed = upload_status[upload_status["status"] != "ok"]
+        for _, row in failed.iterrows():
+            st.error(f"❌ Could not process {row['file_name']}: {row['message']}")
 
-        # Duplikate lokal vermeiden
-        if not st.session_state['tga_data'].empty:
-            df_tga = df_tga[~df_tga['sample_id'].isin(st.session_state['tga_data']['sample_id'])]
+        with st.expander(f"📄 Upload status ({len(uploaded_files)} files)", expanded=not failed.empty):
+            st.dataframe(upload_status, hide_index=True)
 
-            # Setze den Session-State mit den neuen Daten (überschreibe die alten Daten)
-            st.session_state['chn_data'] = df_tga
+        # Setze den Session-State mit den neuen Daten (überschreibe die alten Daten)
+        st.session_state['tga_data'] = df_tga
+        st.session_state['tga_source_files'] = manifest_entries("tga", df_tga, upload_status)
 
     except Exception as e:
-        st.error(f"❌ Error in {file_name}: {e}")
+        st.error(f"❌ Error while processing the uploaded files: {e}")
 
-# ----------------------
-# Daten aus DB abrufen (join)
-# ----------------------
-st.sidebar.header("Filter")
+# Alle Lesezugriffe in einer Session und Transaktion; Parsen, Speichern und st.rerun() liegen außerhalb
+with unit_of_work():
+    # ----------------------
+    # Daten aus DB abrufen (join)
+    # ----------------------
+    st.sidebar.header("Filter")
 
-# Sicherstellen, dass wir Daten von der DB abrufen können und sie existieren
-try:
-    all_tga_data = fetch_all_eltra_tga_data()
+    # Filter werden in der Datenbank angewendet – pro Rerun wird nur eine Seite geladen
+    try:
+        proj_tga = fetch_projects("eltra_tga_data")
+
+        if not proj_tga:
+            st.warning("⚠️ No ELTRA TGA data found in the database.")
+            data = pd.DataFrame()  # Leerer DataFrame, wenn keine Daten vorhanden sind
+        else:
+            # Filter by selected project
+            proj = st.sidebar.selectbox("Project", [""] + proj_tga)
+            sample_options = fetch_sample_ids("eltra_tga_data", project=proj or None)
+
+            sid = st.sidebar.selectbox("Sample ID", [""] + sample_options, key="tga_sample_select")
+            date_from, date_to = date_range_filter("Analysis date", key="tga_date_range")
+            filters = {"project": proj or None, "sample_id": sid or None, "date_from": date_from, "date_to": date_to}
+            derived = st.sidebar.checkbox("Show derived values", key="tga_derived", help="Volatiles and fixed carbon on dry (db) and dry-ash-free (daf) basis")
+            data, _ = paged_query(fetch_eltra_tga_data_page, key="tga", derived=derived, **filters)
+
+            # Export aller Treffer (nicht nur der Seite) – blockweise gestreamt, erst beim Klick
+            st.sidebar.download_button(
+                "📥 Download filtered data (CSV)", data=csv_download(lambda: iter_eltra_tga_data(derived=derived, **filters)),
+                file_name="ELTRA_TGA_Export.csv", mime=CSV_MIME
+            )
 
-    if all_tga_data is None or all_tga_data.empty:
-        st.warning("⚠️ No ELTRA TGA data found in the database.")
-        data = pd.DataFrame()  # Leerer DataFrame, wenn keine Daten vorhanden sind
+    except Exception as e:
+        st.error(f"❌ Error fetching data from database: {e}")
+        data = pd.DataFrame()  # Leerer DataFrame, wenn ein Fehler auftritt
+
+    # ----------------------
+    # Anzeige der gefilterten Daten
+    # ----------------------
+    if data.empty:
+        st.warning("⚠️ No ELTRA-TGA data available for the selected filter.")
     else:
-        # Fetch all projects for selectbox, falls vorhanden
-        proj_tga = all_tga_data['project'].dropna().unique().tolist()
-
-        # Filter by selected project
-        proj = st.sidebar.selectbox("Project", [""] + proj_tga)
-        filtered_data = all_tga_data[all_tga_data['project'] == proj] if proj else all_tga_data
-        sample_options = filtered_data['sample_id'].dropna().unique().tolist()
-
-        sid = st.sidebar.selectbox("Sample ID", [""] + sample_options, key="tga_sample_select")
-        if sid:
-            filtered_data = filtered_data[filtered_data['sample_id'] == sid]
-        data = filtered_data
+        st.markdown("<h2 style='text-align: center;'>ELTRA TGA Data</h2>", unsafe_allow_html=True)
+        st.dataframe(data, height=400)
 
-except Exception as e:
-    st.error(f"❌ Error fetching data from database: {e}")
-    data = pd.DataFrame()  # Leerer DataFrame, wenn ein Fehler auftritt
-
-# ----------------------
-# Anzeige der gefilterten Daten
-# ----------------------
-if data.empty:
-    st.warning("⚠️ No ELTRA-TGA data available for the selected filter.")
-else:
-    st.markdown("<h2 style='text-align: center;'>ELTRA TGA Data</h2>", unsafe_allow_html=True)
-    st.dataframe(data, height=400)
+        # Replikat-Statistik – in der Datenbank aggregiert, es kommen nur die Gruppen zurück
+        with st.expander("📊 Replicate Statistics"):
+            group_by = st.radio("Group by", ["sample", "project"], format_func=str.capitalize,
+                                horizontal=True, key="tga_stats_group")
+            st.dataframe(fetch_tga_statistics(group_by, **filters), hide_index=True)
 
 # ----------------------
 # Hochgeladene Daten anzeigen & speichern
@@ -92,18 +101,16 @@ else:
     st.markdown("<h2 style='text-align: center;'>Uploaded ELTRA TGA Data</h2>", unsafe_allow_html=True)
     st.dataframe(st.session_state['tga_data'])
 
-    # Download-Button
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        st.session_state['tga_data'].to_excel(writer, sheet_name="ELTRA TGA", index=False)
-    output.seek(0)
-
-    st.sidebar.download_button("📥 Download Excel", data=output, file_name="ELTRA_TGA_Daten.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    # Download-Button – die Excel-Datei wird erst beim Klick erzeugt
+    st.sidebar.download_button("📥 Download Excel", data=excel_download({"ELTRA TGA": st.session_state['tga_data']}),
+                               file_name="ELTRA_TGA_Daten.xlsx", mime=XLSX_MIME)
 
     # Upload to Database
     if st.sidebar.button("📤 Upload ELTRA TGA to DB"):
-        success, skipped, errors, missing = save_dataframe_to_tga_table(st.session_state['tga_data'])
+        # Der gesamte Batch wird in einer Transaktion gespeichert
+        success, skipped, errors, missing = save_dataframe_to_tga_table(
+            st.session_state['tga_data'], source_files=st.session_state.get('tga_source_files')
+        )
         if success:
             st.success(f"✅ Successfully saved: {success}")
             st.session_state['tga_data'] = pd.DataFrame()
@@ -113,4 +120,10 @@ else:
         if errors:
             st.error(f"❌ Upload Error: {errors}")
         if missing:
-            st.warning(f"⚠️ Sample IDs are not registered: {', '.join(set(missing))}")
\ No newline at end of file
+            st.warning(f"⚠️ Sample IDs are not registered: {', '.join(set(missing))}")
+
+# ----------------------
+# Bereits importierte Dateien
+# ----------------------
+with st.expander("📁 Already loaded files"):
+    st.dataframe(fetch_ingest_manifest("tga"), hide_index=True)
@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-import io
-from services.chn_processing import chn_process_uploaded_file, check_required_chn_headers
-from services.database import fetch_all_chn_data, save_dataframe_to_chn_table
+from services.batch_upload import parse_uploaded_files, manifest_entries
+from services.database import fetch_ingest_manifest, fetch_chn_data_page, fetch_projects, fetch_sample_ids, save_dataframe_to_chn_table, iter_chn_data, fetch_chn_statistics, unit_of_work
+from services.export import excel_download, csv_download, XLSX_MIME, CSV_MIME
+from services.siedbar_layout import paged_query, skip_ingested_files, date_range_filter
 
 # Sicherstellen, dass ein Benutzer eingeloggt ist
 if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
@@ -15,66 +16,82 @@ if 'chn_data' not in st.session_state:
 
 st.set_page_config(page_title="CHN Analysis", page_icon="📈", layout="wide")
 
-# Datei-Upload
-uploaded_file = st.file_uploader("Upload CHN files", type=["txt", "csv"], accept_multiple_files=False)
+# Datei-Upload (mehrere Dateien möglich, z. B. alle Messungen eines Tages)
+uploaded_files = st.file_uploader("Upload CHN files", type=["txt", "csv"], accept_multiple_files=True)
 
-if uploaded_file:
+if uploaded_files:
     # Lösche die vorherigen Daten im Session-State, bevor neue hochgeladen werden
     st.session_state['chn_data'] = pd.DataFrame()
 
-
-    file_name = uploaded_file.name
     try:
-        content = uploaded_file.read().decode("utf-8")
-        if not check_required_chn_headers(content):
-            st.error(f"❌ Invalid headers in {file_name}")
+        # Bereits importierte Dateien über das Manifest erkennen – vor jedem Parsen
+        uploaded_files = skip_ingested_files(uploaded_files)
+
+        # Alle Dateien parallel parsen und zu einem deduplizierten DataFrame zusammenführen
+        df_chn, upload_status = parse_uploaded_files("chn", uploaded_files)
 
-        df_chn = chn_process_uploaded_file(content)
-        if df_chn is None:
-            st.error(f"⚠️ Could not process {file_name}")
+        failed = upload_status[upload_status["status"] != "ok"]
+        for _, row in failed.iterrows():
+            st.error(f"⚠️ Could not process {row['file_name']}: {row['message']}")
+
+        with st.expander(f"📄 Upload status ({len(uploaded_files)} files)", expanded=not failed.empty):
+            st.dataframe(upload_status, hide_index=True)
 
         # Setze den Session-State mit den neuen Daten (überschreibe die alten Daten)
         st.session_state['chn_data'] = df_chn
+        st.session_state['chn_source_files'] = manifest_entries("chn", df_chn, upload_status)
 
     except Exception as e:
-        st.error(f"❌ Error in {file_name}: {e}")
-# ----------------------
-# Daten aus DB abrufen (join)
-# ----------------------
-st.sidebar.header("Filter")
+        st.error(f"❌ Error while processing the uploaded files: {e}")
 
-# Sicherstellen, dass wir Daten von der DB abrufen können und sie existieren
-try:
-    all_chn_data = fetch_all_chn_data()
+# Alle Lesezugriffe in einer Session und Transaktion; Parsen, Speichern und st.rerun() liegen außerhalb
+with unit_of_work():
+    # ----------------------
+    # Daten aus DB abrufen (join)
+    # ----------------------
+    st.sidebar.header("Filter")
 
-    if all_chn_data is None or all_chn_data.empty:
-        st.warning("⚠️ No CHN data found in the database.")
-        data = pd.DataFrame()  # Leerer DataFrame, wenn keine Daten vorhanden sind
+    # Filter werden in der Datenbank angewendet – pro Rerun wird nur eine Seite geladen
+    try:
+        proj_chn = fetch_projects("chn_data")
+
+        if not proj_chn:
+            st.warning("⚠️ No CHN data found in the database.")
+            data = pd.DataFrame()  # Leerer DataFrame, wenn keine Daten vorhanden sind
+        else:
+            # Filter by selected project
+            proj = st.sidebar.selectbox("Project", [""] + proj_chn)
+            sample_options = fetch_sample_ids("chn_data", project=proj or None)
+
+            sid = st.sidebar.selectbox("Sample ID", [""] + sample_options, key="chn_sample_select")
+            date_from, date_to = date_range_filter("Analysis date", key="chn_date_range")
+            filters = {"project": proj or None, "sample_id": sid or None, "date_from": date_from, "date_to": date_to}
+            derived = st.sidebar.checkbox("Show derived values", key="chn_derived", help="Atomic H/C and N/C ratios")
+            data, _ = paged_query(fetch_chn_data_page, key="chn", derived=derived, **filters)
+
+            # Export aller Treffer (nicht nur der Seite) – blockweise gestreamt, erst beim Klick
+            st.sidebar.download_button(
+                "📥 Download filtered data (CSV)", data=csv_download(lambda: iter_chn_data(derived=derived, **filters)),
+                file_name="CHN_Export.csv", mime=CSV_MIME
+            )
+    except Exception as e:
+        st.error(f"❌ Error fetching data from database: {e}")
+        data = pd.DataFrame()  # Leerer DataFrame, wenn ein Fehler auftritt
+
+    # ----------------------
+    # Anzeige der gefilterten Daten
+    # ----------------------
+    if data.empty:
+        st.warning("⚠️ No CHN data available for the selected filter.")
     else:
-        # Fetch all projects for selectbox, falls vorhanden
-        proj_chn = all_chn_data['project'].dropna().unique().tolist()
-
-        # Filter by selected project
-        proj = st.sidebar.selectbox("Project", [""] + proj_chn)
-        filtered_data = all_chn_data[all_chn_data['project'] == proj] if proj else all_chn_data
-        sample_options = filtered_data['sample_id'].dropna().unique().tolist()
-
-        sid = st.sidebar.selectbox("Sample ID", [""] + sample_options, key="chn_sample_select")
-        if sid:
-            filtered_data = filtered_data[filtered_data['sample_id'] == sid]
-        data = filtered_data
-except Exception as e:
-    st.error(f"❌ Error fetching data from database: {e}")
-    data = pd.DataFrame()  # Leerer DataFrame, wenn ein Fehler auftritt
+        st.markdown("<h2 style='text-align: center;'>CHN Data</h2>", unsafe_allow_html=True)
+        st.dataframe(data, height=400)
 
-# ----------------------
-# Anzeige der gefilterten Daten
-# ----------------------
-if data.empty:
-    st.warning("⚠️ No CHN data available for the selected filter.")
-else:
-    st.markdown("<h2 style='text-align: center;'>CHN Data</h2>", unsafe_allow_html=True)
-    st.dataframe(data, height=400)
+        # Replikat-Statistik – in der Datenbank aggregiert, es kommen nur die Gruppen zurück
+        with st.expander("📊 Replicate Statistics"):
+            group_by = st.radio("Group by", ["sample", "project"], format_func=str.capitalize,
+                                horizontal=True, key="chn_stats_group")
+            st.dataframe(fetch_chn_statistics(group_by, **filters), hide_index=True)
 
 # ----------------------
 # Hochgeladene Daten anzeigen & speichern
@@ -85,17 +102,16 @@ else:
     st.markdown("<h2 style='text-align: center;'>Uploaded CHN Data</h2>", unsafe_allow_html=True)
     st.dataframe(st.session_state['chn_data'])
 
-    # Download-Button
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        st.session_state['chn_data'].to_excel(writer, sheet_name="CHN", index=False)
-    output.seek(0)
-
-    st.sidebar.download_button("📥 Download Excel", data=output, file_name="CHN_Daten.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    # Download-Button – die Excel-Datei wird erst beim Klick erzeugt
+    st.sidebar.download_button("📥 Download Excel", data=excel_download({"CHN": st.session_state['chn_data']}),
+                               file_name="CHN_Daten.xlsx", mime=XLSX_MIME)
 
     # Upload to Database
     if st.sidebar.button("📤 Upload CHN to DB"):
-        success, skipped, errors, missing = save_dataframe_to_chn_table(st.session_state['chn_data'])
+        # Der gesamte Batch wird in einer Transaktion gespeichert
+        success, skipped, errors, missing = save_dataframe_to_chn_table(
+            st.session_state['chn_data'], source_files=st.session_state.get('chn_source_files')
+        )
         if success:
             st.success(f"✅ Successfully saved: {success}")
             st.session_state['chn_data'] = pd.DataFrame()
@@ -105,4 +121,10 @@ else:
         if errors:
             st.error(f"❌ Upload Error: {errors}")
         if missing:
-            st.warning(f"⚠️ Sample IDs are not registered: {', '.join(set(missing))}")
\ No newline at end of file
+            st.warning(f"⚠️ Sample IDs are not registered: {', '.join(set(missing))}")
+
+# ----------------------
+# Bereits importierte Dateien
+# ----------------------
+with st.expander("📁 Already loaded files"):
+    st.dataframe(fetch_ingest_manifest("chn"), hide_index=True)
@@ -0,0 +1,53 @@
+import streamlit as st
+import pandas as pd
+from services.database import fetch_sample_report_page, iter_sample_report, fetch_projects, fetch_sample_ids, unit_of_work
+from services.export import excel_download, XLSX_MIME
+from services.siedbar_layout import paged_query, date_range_filter
+
+# Login prüfen
+if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
+    st.warning("You must be logged in to access this page.")
+    st.stop()
+
+st.set_page_config(page_title="Sample Report", page_icon="📋", layout="wide")
+
+st.markdown("<h2 style='text-align: center;'>Sample Report</h2>", unsafe_allow_html=True)
+st.caption("Registration data with CHN and ELTRA TGA replicate means (`_mean`, `_std`, `_n` = replicates) – one row per sample.")
+
+# Alle Lesezugriffe in einer Session und Transaktion – die Anzeige liegt außerhalb
+with unit_of_work():
+    # ----------------------
+    # Filter (werden in der Datenbank angewendet – pro Rerun wird nur eine Seite geladen)
+    # ----------------------
+    st.sidebar.header("Filter")
+    try:
+        proj = st.sidebar.selectbox("Project", [""] + fetch_projects())
+        sid = st.sidebar.selectbox("Sample ID", [""] + fetch_sample_ids(project=proj or None), key="report_sample_select")
+        date_from, date_to = date_range_filter("Registration date", key="report_date_range")
+        measured_only = st.sidebar.checkbox("Only samples with measurements", key="report_measured_only")
+        derived = st.sidebar.checkbox(
+            "Show derived values", key="report_derived",
+            help="Volatiles/fixed carbon on db and daf basis, atomic H/C and N/C – from the replicate means"
+        )
+
+        filters = {"project": proj or None, "sample_id": sid or None, "date_from": date_from, "date_to": date_to,
+                   "measured_only": measured_only, "derived": derived}
+        data, _ = paged_query(fetch_sample_report_page, key="report", **filters)
+
+        # Export des gesamten Reports als ein Sheet – gestreamt, erst beim Klick erzeugt
+        st.sidebar.download_button(
+            "📥 Download Report (Excel)",
+            data=excel_download(lambda: {"Sample Report": iter_sample_report(**filters)}),
+            file_name="Sample_Report.xlsx", mime=XLSX_MIME
+        )
+    except Exception as e:
+        st.error(f"❌ Error fetching data from database: {e}")
+        data = pd.DataFrame()  # Leerer DataFrame, wenn ein Fehler auftritt
+
+# ----------------------
+# Anzeige
+# ----------------------
+if data.empty:
+    st.warning("⚠️ No samples available for the selected filter.")
+else:
+    st.dataframe(data, height=600, hide_index=True)
@@ -1,5 +1,10 @@
 import streamlit as st
-from services.database import fetch_all_users, add_user, update_user_role, delete_user
+from services.database import (
+    fetch_all_users, add_user, update_user_role, delete_user, get_query_cache_stats,
+    check_sample_summary, rebuild_sample_summary
+)
+from services.parse_cache import get_parse_cache_stats
+from services.logs import get_session_logs, get_logging_stats
 
 def admin_dashboard():
     st.title("Admin Dashboard")
@@ -61,4 +66,38 @@ def admin_dashboard():
         for user in users:
             st.write(f"👤 Username: `{user[0]}` | Role: `{user[1]}`")
     else:
-        st.info("No users found.")
\ No newline at end of file
+        st.info("No users found.")
+
+    # ---------------------------
+    # Caches
+    # ---------------------------
+    with st.expander("Query Cache"):
+        st.json(get_query_cache_stats())
+    with st.expander("Parsed File Cache"):
+        st.json(get_parse_cache_stats())
+
+    # ---------------------------
+    # Sample Summary
+    # ---------------------------
+    with st.expander("Sample Summary"):
+        col_check, col_rebuild = st.columns(2)
+        if col_check.button("Check Consistency"):
+            mismatches = check_sample_summary()
+            if mismatches.empty:
+                st.success("✅ sample_summary is consistent.")
+            else:
+                st.warning(f"⚠️ {mismatches['sample_id'].nunique()} samples differ from the measurements.")
+                st.dataframe(mismatches, hide_index=True)
+        if col_rebuild.button("Rebuild"):
+            count = rebuild_sample_summary()
+            if count is None:
+                st.error("❌ Could not rebuild sample_summary. Check logs for details.")
+            else:
+                st.success(f"✅ sample_summary rebuilt ({count} samples).")
+
+    # ---------------------------
+    # Logs
+    # ---------------------------
+    with st.expander("Session Logs"):
+        st.json(get_logging_stats())
+        st.code("\n".join(get_session_logs()) or "No log entries for this session.", language="text")
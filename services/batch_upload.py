@@ -0,0 +1,209 @@
+import os
+import logging
+import threading
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.eltra_tga_processing import check_required_tga_headers, read_tga_file
+from services.chn_processing import read_chn_file
+from services.parse_cache import upload_hash, get_parsed, store_parsed, PARSER_VERSIONS
+from services.cache import TTLCache
+
+
+# Schlüsselspalten, über die Messungen aus mehreren Dateien dedupliziert werden
+KEY_COLUMNS = {
+    "tga": ["sample_id", "analysis_date", "moisture"],
+    "chn": ["sample_id", "analysis_date"],
+}
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Worker nicht per fork aus dem Streamlit-Server erzeugen: sie würden dessen Threads, Locks und
+# offene Datenbank-Sockets erben. forkserver (Linux/macOS) bzw. spawn startet saubere Prozesse.
+PARSE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Zusammengeführtes Ergebnis je Upload-Auswahl – ein Rerun ohne Änderung ist ein reiner Lookup
+_merged_cache = TTLCache(max_entries=16, ttl=None)
+
+
+def _get_pool():
+    """Prozessweiter Pool für das Parsen – wird beim ersten Batch-Upload erzeugt."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context(PARSE_START_METHOD)
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def parse_instrument_file(instrument, file_name, data):
+    """
+    Parst eine einzelne Gerätedatei ohne Streamlit-Ausgaben (läuft auch im Worker-Prozess).
+
+    Args:
+        instrument (str): "tga" oder "chn".
+        file_name (str): Dateiname für die Statusmeldung.
+        data (bytes): Dateiinhalt.
+
+    Returns:
+        dict: `file_name`, `status` ("ok"/"error"), `rows`, `message` und `df` (DataFrame oder None).
+    """
+    result = {"file_name": file_name, "status": "error", "rows": 0, "message": "", "df": None}
+    try:
+        if instrument == "tga":
+            if not check_required_tga_headers(data):
+                result["message"] = "Invalid headers"
+                return result
+            metadata, df = read_tga_file(data)
+            raw_date = metadata.get("Analyse durchgeführt")
+            # Ohne Datum greift die Duplikatprüfung (sample_id, analysis_date) nicht – Datei ablehnen
+            if not raw_date:
+                result["message"] = "No 'Analyse durchgeführt:' date found"
+                return result
+            if df["analysis_date"].isna().all():
+                result["message"] = f"Unrecognised analysis date '{raw_date}'"
+                return result
+        elif instrument == "chn":
+            df, missing = read_chn_file(data)
+            if df is None:
+                result["message"] = f"Missing headers: {', '.join(missing)}"
+                return result
+            undated = int(df["analysis_date"].isna().sum())
+            if undated:
+                result["message"] = f"{undated} rows without recognisable analysis date"
+                return result
+        else:
+            raise ValueError(f"Unknown instrument '{instrument}'")
+
+        result.update(status="ok", rows=len(df), df=df)
+    except Exception as e:
+        result["message"] = str(e)
+    return result
+
+
+def parse_files(instrument, files):
+    """
+    Parst mehrere Gerätedateien parallel im Prozess-Pool.
+
+    Args:
+        instrument (str): "tga" oder "chn".
+        files (list[tuple[str, bytes]]): Dateiname und Inhalt je Datei.
+
+    Returns:
+        list[dict]: Ergebnisse von `parse_instrument_file` in der Reihenfolge von `files`.
+    """
+    if len(files) <= 1 or PARSE_WORKERS <= 1:
+        return [parse_instrument_file(instrument, name, data) for name, data in files]
+
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(parse_instrument_file, instrument, name, data) for name, data in files]
+        return [future.result() for future in futures]
+    except BrokenProcessPool as e:
+        logging.warning(f"⚠️ Parser-Pool ausgefallen, parse seriell weiter: {e}")
+        _reset_pool()
+        return [parse_instrument_file(instrument, name, data) for name, data in files]
+
+
+def merge_parse_results(instrument, results):
+    """
+    Führt die Einzelergebnisse zu einem deduplizierten DataFrame zusammen.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Zusammengeführte Daten (mit Spalte `source_file`) und
+        eine Status-Tabelle pro Datei (Zeilen, Duplikate, Meldung).
+    """
+    frames = [result["df"].assign(source_file=result["file_name"]) for result in results if result["df"] is not None]
+    status = pd.DataFrame(
+        [{k: v for k, v in result.items() if k != "df"} for result in results],
+        columns=["file_name", "status", "rows", "message", "content_hash"]
+    )
+    status["duplicates"] = 0
+
+    if not frames:
+        return pd.DataFrame(), status
+
+    merged = pd.concat(frames, ignore_index=True)
+    duplicated = merged.duplicated(subset=KEY_COLUMNS[instrument])
+    if duplicated.any():
+        per_file = merged.loc[duplicated, "source_file"].value_counts()
+        status["duplicates"] = status["file_name"].map(per_file).fillna(0).astype(int)
+        merged = merged[~duplicated]
+
+    merged = merged.sort_values(by="sample_id", kind="stable", ignore_index=True)
+    return merged, status
+
+
+def parse_uploaded_files(instrument, uploaded_files):
+    """
+    Liest Streamlit-Uploads, parst sie parallel und liefert (Daten, Status-Tabelle).
+
+    Bereits geparste Dateien (gleicher Inhalt, gleiche Parser-Version) kommen aus dem
+    Parse-Cache – bei einem Rerun wird nur noch nachgeschlagen, nicht erneut geparst.
+    """
+    digests = [upload_hash(uploaded_file) for uploaded_file in uploaded_files]
+    selection_key = (instrument, PARSER_VERSIONS[instrument],
+                     tuple((uploaded_file.name, digest) for uploaded_file, digest in zip(uploaded_files, digests)))
+    merged = _merged_cache.get(selection_key)
+    if merged is not None:
+        return merged[0].copy(), merged[1].copy()
+
+    results = [None] * len(uploaded_files)
+    pending = []
+    for index, (uploaded_file, digest) in enumerate(zip(uploaded_files, digests)):
+        cached = get_parsed(instrument, digest)
+        if cached is not None:
+            results[index] = dict(cached, file_name=uploaded_file.name)
+        else:
+            pending.append((index, digest, uploaded_file))
+
+    if pending:
+        files = [(uploaded_file.name, uploaded_file.getvalue()) for _, _, uploaded_file in pending]
+        for (index, digest, _), result in zip(pending, parse_files(instrument, files)):
+            store_parsed(instrument, digest, result)
+            results[index] = result
+
+    for result, digest in zip(results, digests):
+        result["content_hash"] = digest
+
+    merged = merge_parse_results(instrument, results)
+    _merged_cache.set(selection_key, merged)
+    return merged[0].copy(), merged[1].copy()
+
+
+def manifest_entries(instrument, df, status):
+    """
+    Manifest-Einträge (für `ingested_files`) der erfolgreich geparsten Dateien eines Batches.
+
+    Args:
+        df (pd.DataFrame): Zusammengeführte Daten mit Spalte `source_file`.
+        status (pd.DataFrame): Status-Tabelle aus `merge_parse_results`.
+    """
+    if df is None or df.empty or "source_file" not in df.columns:
+        return []
+
+    analysis_dates = df.groupby("source_file")["analysis_date"].first()
+    entries = []
+    for row in status[status["status"] == "ok"].itertuples(index=False):
+        entries.append({
+            "content_hash": row.content_hash,
+            "instrument": instrument,
+            "file_name": row.file_name,
+            "analysis_date": None if pd.isna(analysis_dates.get(row.file_name))
+            else analysis_dates.get(row.file_name).to_pydatetime(),
+            "row_count": int(row.rows),
+        })
+    return entries
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-sicherer LRU-Cache mit Ablaufzeit (TTL) und Trefferstatistik.
+
+    Jeder Eintrag kann zusätzlich eine `version` tragen (z. B. die Generationszähler der
+    gelesenen Tabellen). Stimmt sie beim Lesen nicht mehr, gilt der Eintrag als veraltet.
+    Mit `ttl=None` laufen Einträge nicht ab und werden nur per LRU verdrängt.
+    """
+
+    def __init__(self, max_entries=256, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version=None, default=None):
+        """Liefert den gespeicherten Wert oder `default` (Miss) zurück."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_version, expires_at = entry
+                if entry_version == version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]  # abgelaufen oder veraltet
+            self.misses += 1
+            return default
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+            self._entries[key] = (value, version, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Kennzahlen für das Monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
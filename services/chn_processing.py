@@ -1,45 +1,165 @@
 import pandas as pd
 import streamlit as st
-import csv
-from io import StringIO
+import io
+from services.dates import parse_instrument_dates
+
+try:
+    from pyarrow import csv as pa_csv  # optional, deutlich schnellerer CSV-Parser
+    import pyarrow as pa
+except ImportError:
+    pa_csv = None
+
+
+# Bei jeder Änderung am Parser erhöhen – gecachte Parse-Ergebnisse werden damit ungültig
+PARSER_VERSION = 4
+
+# Pflicht-Spalten der Kopfzeile einer CHN-Exportdatei
+CHN_REQUIRED_HEADERS = [
+    "sample_id",
+    "Comments",
+    "Mass",
+    "Nitrogen %",
+    "Carbon %",
+    "Hydrogen %",
+    "Analysis Date"
+]
+
+# Eingelesene Spalten und ihre Namen in der Datenbank
+CHN_COLUMN_MAP = {
+    'sample_id': 'sample_id',
+    'Analysis Date': 'analysis_date',
+    'Carbon %': 'carbon_percentage',
+    'Hydrogen %': 'hydrogen_percentage',
+    'Nitrogen %': 'nitrogen_percentage'
+}
+CHN_NUMERIC_COLUMNS = ['carbon_percentage', 'hydrogen_percentage', 'nitrogen_percentage']
+
+
+def _as_binary_stream(source):
+    """Liefert ein binäres file-like-Objekt für Upload, bytes oder str."""
+    if isinstance(source, str):
+        return io.BytesIO(source.encode("utf-8"))
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def find_chn_header(stream):
+    """
+    Sucht die Kopfzeile (Tab-getrennt, enthält alle `CHN_REQUIRED_HEADERS`).
 
+    Der Stream wird nur bis zur Kopfzeile gelesen und steht danach am Anfang der Datenzeilen.
 
-def chn_process_uploaded_file(content: str) -> pd.DataFrame | None:
+    Returns:
+        tuple[list[str] | None, list[str]]: Spaltennamen der Kopfzeile (oder None) und die
+        fehlenden Pflicht-Spalten der am besten passenden Zeile.
     """
-    Liest eine CHN-Analyzedatei ein und verarbeitet sie minimal.
+    missing = list(CHN_REQUIRED_HEADERS)
+    for raw_line in iter(stream.readline, b""):
+        columns = [col.strip() for col in raw_line.decode("utf-8").rstrip("\r\n").split("\t")]
+        line_missing = [header for header in CHN_REQUIRED_HEADERS if header not in columns]
+        if not line_missing:
+            return columns, []
+        if len(line_missing) < len(missing):
+            missing = line_missing
+    return None, missing
+
+
+def _read_columns_c(stream, names, positions, typed):
+    """Liest die Spalten `positions` mit dem C-Parser von pandas."""
+    dtype = {
+        position: ('float64' if typed and name in CHN_NUMERIC_COLUMNS else 'str')
+        for position, name in positions.items()
+    }
+    return pd.read_csv(
+        stream, sep='\t', header=None, names=names, usecols=list(positions), dtype=dtype,
+        encoding='utf-8', engine='c'
+    )
+
+
+def _read_columns_pyarrow(stream, names, positions, typed):
+    """Liest die Spalten `positions` mit dem (mehrfädigen) CSV-Parser von pyarrow."""
+    column_types = {
+        position: (pa.float64() if typed and name in CHN_NUMERIC_COLUMNS else pa.string())
+        for position, name in positions.items()
+    }
+    table = pa_csv.read_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(column_names=names),
+        parse_options=pa_csv.ParseOptions(delimiter='\t'),
+        convert_options=pa_csv.ConvertOptions(include_columns=list(positions), column_types=column_types)
+    )
+    return table.to_pandas()
+
+
+def _read_columns(stream, names, positions, typed):
     """
+    Liest die Spalten `positions` mit pyarrow (falls installiert), sonst mit dem C-Parser.
 
-    try:
-        #print("📂 Datei wird eingelesen...")
-        #print(repr(content))  # Zeigt das genaue Trennzeichen
+    pyarrow lehnt Zeilen mit weniger Feldern als die Kopfzeile ab; der C-Parser füllt sie wie
+    bisher mit NaN auf. Bei solchen Dateien wird daher auf den C-Parser gewechselt.
+    """
+    if pa_csv is not None:
+        data_offset = stream.tell()
+        try:
+            return _read_columns_pyarrow(stream, names, positions, typed)
+        except pa.ArrowInvalid:
+            stream.seek(data_offset)
+    return _read_columns_c(stream, names, positions, typed)
+
+
+def read_chn_file(source):
+    """
+    Liest eine CHN-Exportdatei: Kopfzeile finden, danach nur die fünf benötigten Spalten
+    mit dem pyarrow- bzw. C-CSV-Parser und festen Datentypen einlesen.
+
+    Args:
+        source: Binäres file-like-Objekt (z. B. Streamlit-Upload), bytes oder str.
+
+    Returns:
+        tuple[pd.DataFrame | None, list[str]]: Die Daten (None, wenn die Kopfzeile fehlt)
+        und die Liste der fehlenden Pflicht-Spalten.
+    """
+    stream = _as_binary_stream(source)
+    columns, missing = find_chn_header(stream)
+    if columns is None:
+        return None, missing
+
+    # Spalten positionsbezogen benennen – die Kopfzeile kann leere oder doppelte Namen enthalten
+    names = [str(i) for i in range(len(columns))]
+    positions = {str(columns.index(name)): CHN_COLUMN_MAP[name] for name in CHN_COLUMN_MAP}
 
-        # Verwende StringIO, um den Textinhalt wie eine Datei zu behandeln
-        df_chn_all = pd.read_csv(StringIO(content), sep='\t', encoding='utf-8', engine='python')
-        #print(df_chn_all)
+    data_offset = stream.tell()
+    try:
+        df_chn_all = _read_columns(stream, names, positions, typed=True)
+    except (ValueError, TypeError):
+        # Nicht-numerische Einträge (z. B. "n.a.") – Messwerte wie bisher als NaN übernehmen
+        stream.seek(data_offset)
+        df_chn_all = _read_columns(stream, names, positions, typed=False)
+        for position, name in positions.items():
+            if name in CHN_NUMERIC_COLUMNS:
+                df_chn_all[position] = pd.to_numeric(df_chn_all[position], errors='coerce')
 
-        # Entferne führende Leerzeichen in Spaltennamen
-        df_chn_all.columns = df_chn_all.columns.str.strip()
+    df_chn_all = df_chn_all.rename(columns=positions)[list(CHN_COLUMN_MAP.values())]
+    df_chn_all['analysis_date'] = parse_instrument_dates(df_chn_all['analysis_date'])
 
-        # Wähle nur die relevanten Spalten
-        required_columns = ['sample_id', 'Analysis Date', 'Carbon %', 'Hydrogen %', 'Nitrogen %']
-        df_chn_all = df_chn_all[required_columns]
-        df_chn_all.rename(columns={
-            'Analysis Date': 'analysis_date',
-            'Carbon %': 'carbon_percentage',
-            'Hydrogen %': 'hydrogen_percentage',
-            'Nitrogen %': 'nitrogen_percentage'
-        }, inplace=True)
+    # Sortiere nach 'sample_id'
+    df_chn_all = df_chn_all.sort_values(by='sample_id', ascending=True, ignore_index=True)
+    return df_chn_all, []
 
-        # Konvertiere numerische Spalten
-        for col in ['carbon_percentage', 'hydrogen_percentage', 'nitrogen_percentage']:
-            df_chn_all[col] = pd.to_numeric(df_chn_all[col], errors='coerce')
 
-        # Sortiere nach 'sample_id'
-        df_chn_all = df_chn_all.sort_values(by='sample_id', ascending=True)
+def chn_process_uploaded_file(content) -> pd.DataFrame | None:
+    """
+    Liest eine CHN-Analyzedatei ein und verarbeitet sie minimal.
 
-        # Zeige die ersten Zeilen zur Überprüfung
-        #print(df_chn_all.head())
+    Args:
+        content: Upload als binäres file-like-Objekt, bytes oder dekodierter str.
+    """
 
+    try:
+        df_chn_all, missing = read_chn_file(content)
+        if df_chn_all is None:
+            st.error(f"❌ Fehlende Spalten in der Kopfzeile: {', '.join(missing)}")
         return df_chn_all
 
     except Exception as e:
@@ -63,35 +183,23 @@ def chn_calculate_mean(df_chn_all: pd.DataFrame) -> pd.DataFrame:
 
 
 
-def check_required_chn_headers(file_data: str) -> bool:
+def check_required_chn_headers(file_data) -> bool:
     """
     Validates whether the uploaded CHN analysis file contains all required headers.
 
     Args:
-        file_data (str): The raw content of the file as a UTF-8 decoded string.
+        file_data: The file as binary file-like object (read position is restored), bytes or string.
 
     Returns:
         bool: True if all required headers are found in any row, False otherwise.
     """
-    required_headers = [
-        "sample_id",
-        "Comments",
-        "Mass",
-        "Nitrogen %",
-        "Carbon %",
-        "Hydrogen %",
-        "Analysis Date"
-    ]
-
+    stream = _as_binary_stream(file_data)
+    position = stream.tell()
     try:
-        reader = csv.reader(file_data.splitlines(), delimiter="\t")
-
-        for row in reader:
-            if all(header in row for header in required_headers):
-                return True  # All headers found
-        return False  # No matching header row found
+        columns, _ = find_chn_header(stream)
+        return columns is not None
 
     except Exception:
         return False
-
-
+    finally:
+        stream.seek(position)
@@ -1,23 +1,33 @@
 import os
-import bcrypt
 import streamlit as st
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, String, Integer, Float, Text, ForeignKey, inspect
+from sqlalchemy import create_engine, event, Column, String, Integer, Float, Text, Date, DateTime, ForeignKey, select, insert, func
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from sqlalchemy.schema import UniqueConstraint
 import pandas as pd
 import logging
+import functools
+import datetime
+import threading
+import contextlib
+import contextvars
+from services.cache import TTLCache
+from services.dates import to_date, to_datetime_bound
+from services.derived import add_derived_columns
+from services.logs import setup_logging
+from services.security import (
+    hash_password, verify_password, needs_rehash,
+    login_retry_after, record_login_failure, reset_login_failures
+)
 
 
 
 # -------------------------------
 # 🔧 Logging konfigurieren
 # -------------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
+# Root-Logger → begrenzte Queue → Listener-Thread (Konsole, Session-Puffer, optional Datei)
+setup_logging()
 
 # -------------------------------
 # 🌍 Umgebung laden
@@ -45,10 +55,124 @@ if not DATABASE_URI:
 # -------------------------------
 # 🛠️ SQLAlchemy Setup
 # -------------------------------
-engine = create_engine(DATABASE_URI)
+def _env_flag(name, default):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def engine_options(uri):
+    """
+    Pool-Einstellungen aus der Umgebung (`.env.{mode}`):
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE (Sekunden) und DB_POOL_PRE_PING.
+    SQLite (lokale Datei/Speicher) erhält keine Pool-Parameter.
+    """
+    if uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+    }
+
+
+def _enable_sqlite_transactions(engine):
+    """
+    pysqlite beginnt Transaktionen selbst erst vor DML-Anweisungen, wodurch SAVEPOINTs (siehe
+    `unit_of_work`) vorzeitig committen würden. BEGIN setzt daher SQLAlchemy ab.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+@st.cache_resource(show_spinner=False)
+def get_engine(uri, **options):
+    """Prozessweite Engine – bleibt auch beim Neuladen der Module (Dateiänderungen) bestehen."""
+    logging.info(f"🔌 Engine erstellt ({', '.join(f'{k}={v}' for k, v in options.items()) or 'Standard-Pool'})")
+    engine = create_engine(uri, **options)
+    if engine.dialect.name == "sqlite":
+        _enable_sqlite_transactions(engine)
+    return engine
+
+
+engine = get_engine(DATABASE_URI, **engine_options(DATABASE_URI))
 Session = sessionmaker(bind=engine)
 Base = declarative_base()
 
+# -------------------------------
+# 🗄️ Query-Cache für Lese-Funktionen
+# -------------------------------
+# Prozessweiter Cache: Ergebnisse werden nach Funktion und Filterargumenten abgelegt und
+# über einen Generationszähler pro Tabelle invalidiert, den die Schreib-Funktionen erhöhen.
+_query_cache = TTLCache(
+    max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256")),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "300"))
+)
+_table_generations = {}
+_generation_lock = threading.Lock()
+_MISSING = object()
+
+
+def bump_table_generation(*tables):
+    """Markiert die Tabellen als geändert – alle darauf basierenden Cache-Einträge verfallen."""
+    with _generation_lock:
+        for table in tables:
+            _table_generations[table] = _table_generations.get(table, 0) + 1
+
+
+class _NoCache:
+    """Rückgabewert, der nicht gecacht werden soll (z. B. Fehlerfall)."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+def cached_query(*tables):
+    """
+    Decorator für Lese-Funktionen, die aus `tables` lesen.
+    Gibt die Funktion `_NoCache(value)` zurück, wird `value` geliefert, aber nicht gespeichert.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            version = tuple(_table_generations.get(table, 0) for table in tables)
+
+            cached = _query_cache.get(key, version=version, default=_MISSING)
+            if cached is _MISSING:
+                result = func(*args, **kwargs)
+                if isinstance(result, _NoCache):
+                    return result.value
+                _query_cache.set(key, result, version=version)
+                cached = result
+
+            return _copy_result(cached)
+        return wrapper
+    return decorator
+
+
+def _copy_result(value):
+    """Kopie zurückgeben, damit Aufrufer den Cache-Eintrag nicht verändern."""
+    if isinstance(value, tuple):
+        return tuple(_copy_result(item) for item in value)
+    return value.copy() if hasattr(value, "copy") else value
+
+
+def get_query_cache_stats():
+    """Hit/Miss-Zähler und Füllstand des Query-Caches (für Monitoring)."""
+    stats = _query_cache.stats()
+    stats["table_generations"] = dict(_table_generations)
+    return stats
+
+
+def clear_query_cache():
+    _query_cache.clear()
+
 def get_session():
     try:
         return Session()
@@ -56,12 +180,87 @@ def get_session():
         logging.error(f"❌ Fehler bei Session-Erstellung: {e}")
         return None
 
-def sample_exists(sample_id):
-    session = get_session()
+# -------------------------------
+# 🔁 Unit of Work
+# -------------------------------
+# Session der aktuell laufenden Unit of Work. Als ContextVar getrennt je Thread (Streamlit führt
+# jeden Skriptlauf in einem eigenen Thread aus) und je asyncio-Task; neue Threads starten ohne
+_active_session = contextvars.ContextVar("unit_of_work_session", default=None)
+
+
+def mark_changed(session, *tables):
+    """Merkt geänderte Tabellen vor – ihre Cache-Generation wird nach Commit/Rollback erhöht."""
+    session.info.setdefault("changed_tables", set()).update(tables)
+
+
+def _finish(session, commit):
     try:
-        return session.query(Sample).filter_by(sample_id=sample_id).first() is not None
+        if commit:
+            session.commit()
+        else:
+            session.rollback()
+    finally:
+        # Auch nach einem Rollback: gecachte Lesevorgänge innerhalb der Transaktion verwerfen
+        bump_table_generation(*session.info.pop("changed_tables", ()))
+
+
+@contextlib.contextmanager
+def unit_of_work():
+    """
+    Eine Session und eine Transaktion für zusammengehörige Datenbankzugriffe (z. B. ein Batch-Job).
+
+    Die Seiten legen sie um ihren Leseblock (Projekte, Sample-IDs, Seite, Statistik): alle Abfragen
+    eines Reruns teilen sich so eine Connection. Nicht um Parsen, Passwort-Hashing oder
+    `st.rerun()` legen – solange sie offen ist, bleibt die Connection belegt (PostgreSQL: "idle in
+    transaction") und unter SQLite hält schon der erste Lesezugriff eine Sperre, die
+    Schreibvorgänge anderer Sessions blockiert. Lese-Helfer außerhalb einer Unit of Work nutzen
+    jeweils eine eigene, kurze Connection.
+
+    Alle Helfer dieses Moduls treten einer aktiven Unit of Work bei (gleiche Session, gleiche
+    Connection) und committen nicht selbst. Verschachtelte Aufrufe laufen in einem SAVEPOINT:
+    schlägt ein Helfer fehl, wird nur sein Teil zurückgerollt und er meldet den Fehler wie
+    gewohnt über seinen Rückgabewert.
+
+    Am Ende wird committet, bei einer Exception zurückgerollt. `st.rerun()`/`st.stop()` beenden
+    den Lauf über eine BaseException und gelten als regulärer Abschluss.
+    """
+    session = _active_session.get()
+    if session is not None:
+        with session.begin_nested():
+            yield session
+        return
+
+    session = Session()
+    token = _active_session.set(session)
+    try:
+        yield session
+    except Exception:
+        _finish(session, commit=False)
+        raise
+    except BaseException as e:
+        _finish(session, commit=not isinstance(e, KeyboardInterrupt))
+        raise
+    else:
+        _finish(session, commit=True)
     finally:
+        _active_session.reset(token)
         session.close()
+
+
+@contextlib.contextmanager
+def _connection():
+    """Connection für Core-Abfragen: die der aktiven Unit of Work oder eine eigene aus dem Pool."""
+    session = _active_session.get()
+    if session is not None:
+        yield session.connection()
+    else:
+        with engine.connect() as connection:
+            yield connection
+
+
+def sample_exists(sample_id):
+    with unit_of_work() as session:
+        return session.query(Sample).filter_by(sample_id=sample_id).first() is not None
 # ORM-Tabellen
 class User(Base):
     __tablename__ = 'users'
@@ -75,9 +274,9 @@ class Sample(Base):
     eltra_tga_data = relationship("EltraTGAData", back_populates="sample")
     sample_id = Column(String, primary_key=True)
     sample_type = Column(String)
-    project = Column(String)
-    registration_date = Column(String)
-    sampling_date = Column(String)
+    project = Column(String, index=True)
+    registration_date = Column(Date, index=True)
+    sampling_date = Column(Date)
     sampling_location = Column(String)
     sample_condition = Column(String)
     responsible_person = Column(String)
@@ -91,7 +290,7 @@ class CHNData(Base):
 
     sample = relationship("Sample", back_populates="chn_data")  # <-- wichtig
 
-    analysis_date = Column(String)
+    analysis_date = Column(DateTime, index=True)
     carbon_percentage = Column(Float)
     hydrogen_percentage = Column(Float)
     nitrogen_percentage = Column(Float)
@@ -105,7 +304,7 @@ class EltraTGAData(Base):
     sample_id = Column(String, ForeignKey('samples.sample_id'))
 
     sample = relationship("Sample", back_populates="eltra_tga_data")  # <-- wichtig
-    analysis_date = Column(String)
+    analysis_date = Column(DateTime, index=True)
     moisture = Column(Float)
     volatiles_ar = Column(Float)
     volatiles_db = Column(Float)
@@ -115,18 +314,101 @@ class EltraTGAData(Base):
     ash_hta_db = Column(Float)
     fixed_c_ar = Column(Float)
 
+
+class IngestedFile(Base):
+    """Manifest der importierten Gerätedateien – eine Zeile pro Dateiinhalt (SHA-256)."""
+    __tablename__ = 'ingested_files'
+    content_hash = Column(String(64), primary_key=True)
+    instrument = Column(String, nullable=False)
+    file_name = Column(String)
+    analysis_date = Column(DateTime)
+    row_count = Column(Integer)
+    ingested_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+
+class SampleIdSequence(Base):
+    """Laufender Zähler der Sample-IDs je Präfix und Jahr (z. B. ABC_24_00042)."""
+    __tablename__ = 'sample_id_sequences'
+    prefix = Column(String, primary_key=True)
+    year = Column(String, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+
+class SampleSummary(Base):
+    """
+    Replikat-Mittelwerte und -Standardabweichungen je Sample für beide Geräte.
+    Wird beim Import für die betroffenen Samples nachgeführt (siehe `refresh_sample_summary`).
+    """
+    __tablename__ = 'sample_summary'
+    sample_id = Column(String, ForeignKey('samples.sample_id'), primary_key=True)
+
+    chn_n = Column(Integer, nullable=False, default=0)
+    carbon_percentage_mean = Column(Float)
+    carbon_percentage_std = Column(Float)
+    hydrogen_percentage_mean = Column(Float)
+    hydrogen_percentage_std = Column(Float)
+    nitrogen_percentage_mean = Column(Float)
+    nitrogen_percentage_std = Column(Float)
+
+    tga_n = Column(Integer, nullable=False, default=0)
+    moisture_mean = Column(Float)
+    moisture_std = Column(Float)
+    volatiles_ar_mean = Column(Float)
+    volatiles_ar_std = Column(Float)
+    volatiles_db_mean = Column(Float)
+    volatiles_db_std = Column(Float)
+    ash_lta_ar_mean = Column(Float)
+    ash_lta_ar_std = Column(Float)
+    ash_lta_db_mean = Column(Float)
+    ash_lta_db_std = Column(Float)
+    ash_hta_ar_mean = Column(Float)
+    ash_hta_ar_std = Column(Float)
+    ash_hta_db_mean = Column(Float)
+    ash_hta_db_std = Column(Float)
+    fixed_c_ar_mean = Column(Float)
+    fixed_c_ar_std = Column(Float)
+
+    updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
 # Funktionen
 def initialize_database_if_needed():
-    """Initialisiert die Datenbank, wenn noch keine Tabellen vorhanden sind."""
-    inspector = inspect(engine)
-    existing_tables = set(inspector.get_table_names())
-    required_tables = {'users', 'samples', 'chn_data', 'eltra_tga_data'}
-
-    if not required_tables.issubset(existing_tables):
-        initialize_database()
-        logging.info("🆕 Datenbank wurde initialisiert.")
-        return True  # gibt zurück, dass Initialisierung stattfand
-    return False  # war schon vorhanden
+    """
+    Initialisiert die Datenbank bzw. bringt das Schema per Migration auf den aktuellen Stand.
+
+    Returns:
+        bool: True, wenn die Datenbank neu angelegt wurde.
+    """
+    from services.migrations import upgrade_database  # migrations importiert dieses Modul
+    return upgrade_database()
+
+# Hinweis "Datenbank neu angelegt" steht aus – wird von `_run_bootstrap` gesetzt und genau einmal abgeholt
+_fresh_notice_pending = False
+_fresh_notice_lock = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def _run_bootstrap():
+    # Läuft einmal pro Prozess
+    global _fresh_notice_pending
+    fresh = initialize_database_if_needed()
+    if fresh:
+        initialize_default_users()
+    with _fresh_notice_lock:
+        _fresh_notice_pending = fresh
+    return fresh
+
+def bootstrap_database():
+    """
+    Einmaliger Start pro Prozess: Schema-Migrationen und Standard-Admin für neue Datenbanken.
+
+    Returns:
+        bool: True nur beim ersten Aufruf nach dem Neuanlegen der Datenbank – spätere Aufrufe
+        (auch aus anderen Sessions) liefern False.
+    """
+    global _fresh_notice_pending
+    _run_bootstrap()
+    with _fresh_notice_lock:
+        fresh, _fresh_notice_pending = _fresh_notice_pending, False
+    return fresh
 
 def initialize_database():
     try:
@@ -136,93 +418,104 @@ def initialize_database():
         logging.error(f"❌ Fehler beim Erstellen der Tabellen: {e}")
 
 def update_user_role(username, new_role):
-    session = get_session()
     try:
-        user = session.query(User).filter_by(username=username).first()
-        if user:
-            user.role = new_role
-            session.commit()
-            return True
-        return False
+        with unit_of_work() as session:
+            user = session.query(User).filter_by(username=username).first()
+            if user:
+                user.role = new_role
+                session.flush()
+                return True
+            return False
     except Exception as e:
-        session.rollback()
         logging.error(f"❌ Fehler beim Aktualisieren der Rolle: {e}")
         return False
-    finally:
-        session.close()
 
 def delete_user(username):
-    session = get_session()
     try:
-        user = session.query(User).filter_by(username=username).first()
-        if user:
-            session.delete(user)
-            session.commit()
-            return True
-        return False
+        with unit_of_work() as session:
+            user = session.query(User).filter_by(username=username).first()
+            if user:
+                session.delete(user)
+                session.flush()
+                return True
+            return False
     except Exception as e:
-        session.rollback()
         logging.error(f"❌ Fehler beim Löschen des Benutzers: {e}")
         return False
-    finally:
-        session.close()
 
 def initialize_default_users():
-    session = get_session()
     try:
-        existing = session.query(User).filter_by(username="admin").first()
-        if not existing:
-            hashed_pw = bcrypt.hashpw("admin".encode(), bcrypt.gensalt()).decode()
-            session.add(User(username="admin", password=hashed_pw, role="admin"))
-            session.commit()
-            logging.info("✅ Standard-Admin 'admin' wurde erstellt.")
+        with unit_of_work() as session:
+            existing = session.query(User).filter_by(username="admin").first()
+            if not existing:
+                hashed_pw = hash_password("admin")
+                session.add(User(username="admin", password=hashed_pw, role="admin"))
+                session.flush()
+                logging.info("✅ Standard-Admin 'admin' wurde erstellt.")
     except Exception as e:
-        session.rollback()
         logging.error(f"❌ Fehler beim Initialisieren des Standard-Admins: {e}")
-    finally:
-        session.close()
 
 def add_user(username, password, role):
-    session = get_session()
     try:
-        hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-        session.add(User(username=username, password=hashed_pw, role=role))
-        session.commit()
-        return True
+        with unit_of_work() as session:
+            hashed_pw = hash_password(password)
+            session.add(User(username=username, password=hashed_pw, role=role))
+            session.flush()
+            return True
     except IntegrityError:
-        session.rollback()
         logging.warning("⚠️ Benutzername existiert bereits.")
         return False
     except Exception as e:
-        session.rollback()
         logging.error(f"❌ Fehler beim Hinzufügen des Benutzers: {e}")
         return False
-    finally:
-        session.close()
 
-def authenticate_user(username, password):
-    session = get_session()
-    try:
-        user = session.query(User).filter_by(username=username).first()
-        if user and bcrypt.checkpw(password.encode(), user.password.encode()):
-            return True, user.role
+def authenticate_user(username, password, client_ip=None):
+    """
+    Prüft die Anmeldedaten; bcrypt läuft im Hash-Pool (services.security).
+
+    Tritt keiner aktiven Unit of Work bei, sondern nutzt eigene, kurze Sessions.
+
+    Nach zu vielen Fehlversuchen für den Benutzer oder die Client-IP wird ohne Passwortprüfung
+    abgelehnt. Wurde der Hash mit einem anderen Kostenfaktor als `BCRYPT_ROUNDS` erstellt, wird
+    er nach erfolgreichem Login neu berechnet.
+
+    Returns:
+        tuple[bool, str | None]: Erfolg und Rolle.
+    """
+    if login_retry_after(username, client_ip):
+        logging.warning(f"🚦 Login für '{username}' ({client_ip or 'unbekannte IP'}) gedrosselt.")
         return False, None
+    try:
+        # Eigene kurze Session statt einer aktiven Unit of Work beizutreten: deren Connection
+        # (und unter SQLite die Lese-Sperre) bliebe sonst während bcrypt belegt
+        with Session() as session:
+            user = session.query(User).filter_by(username=username).first()
+            stored_hash, role = (user.password, user.role) if user else (None, None)
+
+        # Hashen außerhalb der Session – die Connection ist bereits an den Pool zurückgegeben
+        if not verify_password(password, stored_hash):
+            record_login_failure(username, client_ip)
+            return False, None
+        reset_login_failures(username)
+
+        if needs_rehash(stored_hash):
+            new_hash = hash_password(password)
+            with Session.begin() as session:
+                session.query(User).filter_by(username=username).update({"password": new_hash})
+            logging.info(f"🔑 Passwort-Hash von '{username}' auf neuen Kostenfaktor umgestellt.")
+        return True, role
     except Exception as e:
         logging.error(f"❌ Fehler bei der Authentifizierung: {e}")
         return False, None
-    finally:
-        session.close()
 
 def fetch_all_users():
-    session = get_session()
     try:
-        users = session.query(User).all()
-        return [(user.username, user.role) for user in users]
+        with unit_of_work() as session:
+            users = session.query(User).all()
+            return [(user.username, user.role) for user in users]
     except Exception as e:
         logging.error(f"❌ Fehler beim Laden der Benutzer: {e}")
         return []
-    finally:
-        session.close()
 
 def save_sample_data(
     sample_id,
@@ -234,244 +527,1027 @@ def save_sample_data(
     sample_condition,
     responsible_person
 ):
-    session = get_session()
     try:
-        sample = Sample(
-            sample_id=sample_id,
-            sample_type=sample_type,
-            project=project,
-            registration_date=registration_date,
-            sampling_date=sampling_date,
-            sampling_location=sampling_location,
-            sample_condition=sample_condition,
-            responsible_person=responsible_person
-        )
-        session.add(sample)
-        session.commit()
+        with unit_of_work() as session:
+            sample = Sample(
+                sample_id=sample_id,
+                sample_type=sample_type,
+                project=project,
+                registration_date=to_date(registration_date),
+                sampling_date=to_date(sampling_date),
+                sampling_location=sampling_location,
+                sample_condition=sample_condition,
+                responsible_person=responsible_person
+            )
+            session.add(sample)
+            session.flush()
+            mark_changed(session, Sample.__tablename__)
         return True
     except Exception as e:
-        session.rollback()
         logging.error(f"❌ Fehler beim Speichern des Samples: {e}")
         return False
-    finally:
-        session.close()
 
-def save_dataframe_to_chn_table(df):
-    session = get_session()
-    success_count = 0
-    skipped_count = 0
-    error_count = 0
-    missing_samples = []
+def register_sample(
+    prefix,
+    sample_type,
+    project,
+    registration_date,
+    sampling_date,
+    sampling_location,
+    sample_condition,
+    responsible_person
+):
+    """
+    Vergibt die nächste Sample-ID für `prefix` und speichert das Sample in derselben Transaktion.
+    Schlägt das Speichern fehl, wird auch die Zählererhöhung zurückgerollt.
 
+    Returns:
+        str | None: Die vergebene Sample-ID oder None im Fehlerfall.
+    """
     try:
-        for _, row in df.iterrows():
-            if not sample_exists(row['sample_id']):
-                skipped_count += 1
-                missing_samples.append(row['sample_id'])
-                continue
-
-            exists = session.query(CHNData).filter_by(
-                sample_id=row['sample_id'],
-                analysis_date=row['analysis_date']
-            ).first()
-
-            if exists:
-                skipped_count += 1
-                continue
-
-            entry = CHNData(
-                sample_id=row['sample_id'],
-                analysis_date=row['analysis_date'],
-                carbon_percentage=row['carbon_percentage'],
-                hydrogen_percentage=row['hydrogen_percentage'],
-                nitrogen_percentage=row['nitrogen_percentage']
-            )
-            session.add(entry)
-            success_count += 1
+        with unit_of_work() as session:
+            sample_id = _allocate_sample_ids(session, prefix, 1)[0]
+            session.add(Sample(
+                sample_id=sample_id,
+                sample_type=sample_type,
+                project=project,
+                registration_date=to_date(registration_date),
+                sampling_date=to_date(sampling_date),
+                sampling_location=sampling_location,
+                sample_condition=sample_condition,
+                responsible_person=responsible_person
+            ))
+            session.flush()
+            mark_changed(session, Sample.__tablename__)
+        return sample_id
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Registrieren des Samples: {e}")
+        return None
 
-        session.commit()
+def register_samples(df, registration_date=None):
+    """
+    Sammel-Registrierung: vergibt je Präfix einen zusammenhängenden ID-Block und speichert
+    alle Samples mit einem Bulk-Insert in einer Transaktion (alles oder nichts).
+
+    Args:
+        df (pd.DataFrame): Validierte Zeilen mit den Spalten `prefix`, `sample_type`, `project`,
+            `sampling_date`, `sampling_location`, `sample_condition`, `responsible_person`.
+        registration_date (datetime.date | None): Standard: heute.
+
+    Returns:
+        pd.Series | None: Die vergebenen Sample-IDs (Index wie `df`) oder None im Fehlerfall.
+    """
+    if df is None or df.empty:
+        return pd.Series(dtype=object)
+
+    registration_date = to_date(registration_date) or datetime.date.today()
+    try:
+        with unit_of_work() as session:
+            sample_ids = pd.Series(index=df.index, dtype=object)
+            for prefix, group in df.groupby("prefix", sort=False):
+                sample_ids[group.index] = _allocate_sample_ids(session, prefix, len(group))
+
+            data = df.reindex(columns=[
+                "sample_type", "project", "sampling_date",
+                "sampling_location", "sample_condition", "responsible_person"
+            ])
+            records = data.astype(object).where(data.notna(), None).assign(
+                sample_id=sample_ids, registration_date=registration_date
+            ).to_dict(orient="records")
+            session.connection().execute(insert(Sample.__table__), records)
+            mark_changed(session, Sample.__tablename__)
+
+        logging.info(f"✅ {len(records)} Samples registriert.")
+        return sample_ids
     except Exception as e:
-        session.rollback()
-        logging.error(f"❌ Fehler beim Speichern von CHN-Daten: {e}")
-        error_count += 1
-    finally:
-        session.close()
+        logging.error(f"❌ Fehler bei der Sammel-Registrierung: {e}")
+        return None
 
-    return success_count, skipped_count, error_count, missing_samples
+# -------------------------------
+# 🔢 Sample-ID-Vergabe
+# -------------------------------
+SAMPLE_ID_PATTERN = r"^(?P<prefix>.+)_(?P<year>\d{2})_(?P<counter>\d+)$"
+
+
+def format_sample_id(prefix, year, counter):
+    return f"{prefix}_{year}_{counter:05d}"
 
-def save_dataframe_to_tga_table(df):
-    df.columns = [col.lower() for col in df.columns]
 
-    session = get_session()
+def _dialect_insert(dialect_name):
+    """Dialektspezifisches `insert` mit ON-CONFLICT-Unterstützung oder None."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def _allocate_sample_ids(session, prefix, count, year=None):
+    """
+    Erhöht den Zähler für (prefix, year) atomar um `count` und liefert die reservierten IDs.
+    Läuft in der Transaktion von `session` – sie wird hier nicht committet.
+    """
+    year = year or datetime.datetime.now().strftime("%y")
+    table = SampleIdSequence.__table__
+    connection = session.connection()
+    dialect_insert = _dialect_insert(connection.dialect.name)
+
+    if dialect_insert is not None:
+        # Ein einziges Upsert-Statement: Zeile anlegen oder Zähler erhöhen
+        stmt = dialect_insert(table).values(prefix=prefix, year=year, last_value=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.prefix, table.c.year],
+            set_={"last_value": table.c.last_value + count}
+        ).returning(table.c.last_value)
+        last_value = connection.execute(stmt).scalar_one()
+    else:
+        sequence = session.execute(
+            select(SampleIdSequence).filter_by(prefix=prefix, year=year).with_for_update()
+        ).scalar_one_or_none()
+        if sequence is None:
+            sequence = SampleIdSequence(prefix=prefix, year=year, last_value=0)
+            session.add(sequence)
+        sequence.last_value += count
+        session.flush()
+        last_value = sequence.last_value
+
+    first_value = last_value - count + 1
+    return [format_sample_id(prefix, year, counter) for counter in range(first_value, last_value + 1)]
+
+
+def reserve_sample_ids(prefix, count=1):
+    """
+    Reserviert einen Block von `count` aufeinanderfolgenden Sample-IDs (z. B. für Batch-Registrierung).
+    Nicht verwendete IDs bleiben als Lücke bestehen.
+    """
+    with unit_of_work() as session:
+        return _allocate_sample_ids(session, prefix, count)
+
+
+def backfill_sample_id_sequences():
+    """
+    Einmalige Befüllung der Zählertabelle aus den vorhandenen Sample-IDs.
+    Bestehende Zähler werden nur erhöht, nie verringert.
+    """
+    try:
+        with unit_of_work() as session:
+            count = _backfill_sample_id_sequences(session)
+        logging.info(f"✅ Sample-ID-Zähler für {count} Präfix/Jahr-Kombinationen übernommen.")
+        return count
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Befüllen der Sample-ID-Zähler: {e}")
+        return 0
+
+
+def _backfill_sample_id_sequences(session):
+    """Kern von `backfill_sample_id_sequences` – läuft in der Transaktion von `session`."""
+    sample_ids = pd.Series(session.execute(select(Sample.sample_id)).scalars().all(), dtype=object)
+    parts = sample_ids.str.extract(SAMPLE_ID_PATTERN).dropna()
+    if parts.empty:
+        return 0
+
+    parts["counter"] = parts["counter"].astype(int)
+    maxima = parts.groupby(["prefix", "year"])["counter"].max()
+
+    for (prefix, year), counter in maxima.items():
+        sequence = session.get(SampleIdSequence, (prefix, year))
+        if sequence is None:
+            session.add(SampleIdSequence(prefix=prefix, year=year, last_value=int(counter)))
+        elif sequence.last_value < counter:
+            sequence.last_value = int(counter)
+    session.flush()
+    return len(maxima)
+
+# Spalten, die beim Import in die Messwert-Tabellen geschrieben werden
+CHN_COLUMNS = [
+    "sample_id", "analysis_date",
+    "carbon_percentage", "hydrogen_percentage", "nitrogen_percentage"
+]
+TGA_COLUMNS = [
+    "sample_id", "analysis_date",
+    "moisture", "volatiles_ar", "volatiles_db",
+    "ash_lta_ar", "ash_lta_db", "ash_hta_ar", "ash_hta_db",
+    "fixed_c_ar"
+]
+
+# Max. Anzahl gebundener Parameter pro IN-Liste (SQLite-Limit beachten)
+IN_CLAUSE_CHUNK_SIZE = 500
+
+
+def _chunks(values, size=IN_CLAUSE_CHUNK_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _fetch_existing_sample_ids(session, sample_ids):
+    """Liefert alle registrierten sample_ids aus `sample_ids` (eine Abfrage pro Chunk)."""
+    found = set()
+    for chunk in _chunks(sample_ids):
+        found.update(session.execute(
+            select(Sample.sample_id).where(Sample.sample_id.in_(chunk))
+        ).scalars())
+    return found
+
+
+def _fetch_existing_keys(session, model, key_columns, sample_ids):
+    """Liefert die bereits gespeicherten Schlüssel (key_columns) für die angegebenen sample_ids."""
+    columns = [getattr(model, col) for col in key_columns]
+    rows = []
+    for chunk in _chunks(sample_ids):
+        rows.extend(session.execute(
+            select(*columns).where(model.sample_id.in_(chunk))
+        ).all())
+    return pd.DataFrame(rows, columns=key_columns)
+
+
+def _insert_ignore_duplicates(session, model, records):
+    """
+    Schreibt alle Datensätze mit einem einzigen Bulk-Insert.
+    Auf PostgreSQL/SQLite wird INSERT … ON CONFLICT DO NOTHING verwendet.
+
+    Returns:
+        int: Anzahl der tatsächlich eingefügten Zeilen.
+    """
+    connection = session.connection()
+    dialect_insert = _dialect_insert(connection.dialect.name)
+    if dialect_insert is None:
+        connection.execute(insert(model.__table__), records)
+        return len(records)
+
+    result = connection.execute(dialect_insert(model.__table__).on_conflict_do_nothing(), records)
+    # Bei parallelen Imports können Zeilen zwischenzeitlich eingefügt worden sein
+    return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(records)
+
+
+def _bulk_ingest(df, model, columns, key_columns, label, source_files=None):
+    """
+    Mengenbasierter Import eines DataFrames in eine Messwert-Tabelle.
+
+    Statt pro Zeile zwei Abfragen abzusetzen, werden alle referenzierten sample_ids und
+    alle bereits vorhandenen Schlüssel mit je einer Abfrage aufgelöst und die neuen
+    Zeilen anschließend mit einem Bulk-Insert geschrieben.
+
+    `source_files` (Manifest-Einträge, siehe `IngestedFile`) werden in derselben Transaktion
+    vermerkt – außer für Dateien (Spalte `source_file`) mit nicht registrierten Samples,
+    damit diese nach der Registrierung erneut importiert werden können.
+
+    Returns:
+        tuple: (success_count, skipped_count, error_count, missing_samples)
+    """
     success_count = 0
     skipped_count = 0
     error_count = 0
     missing_samples = []
 
-    try:
-        for _, row in df.iterrows():
-            if not sample_exists(row['sample_id']):
-                skipped_count += 1
-                missing_samples.append(row['sample_id'])
-                continue
-
-            exists = session.query(EltraTGAData).filter_by(
-                sample_id=row['sample_id'],
-                analysis_date=row['analysis_date'],
-                moisture=row['moisture']
-            ).first()
-
-            if exists:
-                skipped_count += 1
-                continue
-
-            entry = EltraTGAData(
-                sample_id=row['sample_id'],
-                analysis_date=row['analysis_date'],
-                moisture=row['moisture'],
-                volatiles_ar=row['volatiles_ar'],
-                volatiles_db=row['volatiles_db'],
-                ash_lta_ar=row['ash_lta_ar'],
-                ash_lta_db=row['ash_lta_db'],
-                ash_hta_ar=row['ash_hta_ar'],
-                ash_hta_db=row['ash_hta_db'],
-                fixed_c_ar=row['fixed_c_ar']
-            )
-            session.add(entry)
-            success_count += 1
+    if df is None or df.empty:
+        return success_count, skipped_count, error_count, missing_samples
 
-        session.commit()
+    try:
+        with unit_of_work() as session:
+            data = df[columns]
+            sample_ids = data["sample_id"].dropna().unique().tolist()
+
+            # 1. Nicht registrierte Samples aussortieren
+            registered = _fetch_existing_sample_ids(session, sample_ids)
+            is_registered = data["sample_id"].isin(registered)
+            missing_samples = data.loc[~is_registered, "sample_id"].tolist()
+            skipped_count += len(missing_samples)
+            data = data[is_registered]
+
+            # 2. Duplikate innerhalb der Datei und gegenüber der Datenbank aussortieren
+            deduplicated = data.drop_duplicates(subset=key_columns)
+            skipped_count += len(data) - len(deduplicated)
+
+            existing = _fetch_existing_keys(session, model, key_columns, deduplicated["sample_id"].unique().tolist())
+            if not existing.empty:
+                merged = deduplicated.merge(existing.drop_duplicates(), on=key_columns, how="left", indicator=True)
+                new_rows = deduplicated[(merged["_merge"] == "left_only").to_numpy()]
+            else:
+                new_rows = deduplicated
+            skipped_count += len(deduplicated) - len(new_rows)
+
+            # 3. Neue Zeilen gesammelt schreiben
+            if not new_rows.empty:
+                records = new_rows.astype(object).where(new_rows.notna(), None).to_dict(orient="records")
+                success_count = _insert_ignore_duplicates(session, model, records)
+                skipped_count += len(records) - success_count
+
+            # 4. Vollständig importierte Dateien im Manifest vermerken
+            manifest = []
+            if source_files:
+                incomplete = set(df.loc[~is_registered, "source_file"]) if "source_file" in df.columns else set()
+                manifest = [entry for entry in source_files if entry["file_name"] not in incomplete]
+                if manifest:
+                    _insert_ignore_duplicates(session, IngestedFile, manifest)
+
+            # 5. Replikat-Zusammenfassung der betroffenen Samples nachführen
+            if success_count:
+                _refresh_sample_summary(session, model, new_rows["sample_id"].unique().tolist())
+                mark_changed(session, model.__tablename__, SampleSummary.__tablename__)
+            if manifest:
+                mark_changed(session, IngestedFile.__tablename__)
     except Exception as e:
-        session.rollback()
-        logging.error(f"❌ Fehler beim Speichern der TGA-Daten: {e}")
+        logging.error(f"❌ Fehler beim Speichern von {label}-Daten: {e}")
         error_count += 1
-    finally:
-        session.close()
+        success_count = 0
 
     return success_count, skipped_count, error_count, missing_samples
 
-def fetch_all_samples(sample_id_filter=None, project_filter=None):
-    session = get_session()
+
+def save_dataframe_to_chn_table(df, source_files=None):
+    return _bulk_ingest(
+        df, CHNData, CHN_COLUMNS,
+        key_columns=["sample_id", "analysis_date"],
+        label="CHN",
+        source_files=source_files
+    )
+
+def save_dataframe_to_tga_table(df, source_files=None):
+    df.columns = [col.lower() for col in df.columns]
+
+    return _bulk_ingest(
+        df, EltraTGAData, TGA_COLUMNS,
+        key_columns=["sample_id", "analysis_date", "moisture"],
+        label="TGA",
+        source_files=source_files
+    )
+
+
+# -------------------------------
+# 📁 Manifest importierter Dateien
+# -------------------------------
+INGESTED_FILE_COLUMNS = ["content_hash", "instrument", "file_name", "analysis_date", "row_count", "ingested_at"]
+
+
+@cached_query("ingested_files")
+def fetch_ingested_files(content_hashes):
+    """
+    Liefert die Manifest-Einträge für die angegebenen Inhalts-Hashes (Primärschlüssel-Lookup).
+
+    Args:
+        content_hashes (tuple[str]): SHA-256-Hashes der hochgeladenen Dateien.
+    """
     try:
-        query = session.query(Sample)
+        table = IngestedFile.__table__
+        stmt = select(*[table.c[col] for col in INGESTED_FILE_COLUMNS]) \
+            .where(table.c.content_hash.in_(list(content_hashes)))
+        return _read_frame(stmt)
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden des Datei-Manifests: {e}")
+        return _NoCache(pd.DataFrame(columns=INGESTED_FILE_COLUMNS))
+
+
+@cached_query("ingested_files")
+def fetch_ingest_manifest(instrument=None, limit=100):
+    """Die zuletzt importierten Dateien (optional eines Geräts), neueste zuerst."""
+    try:
+        table = IngestedFile.__table__
+        stmt = select(*[table.c[col] for col in INGESTED_FILE_COLUMNS])
+        if instrument:
+            stmt = stmt.where(table.c.instrument == instrument)
+        return _read_frame(stmt.order_by(table.c.ingested_at.desc()).limit(limit))
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden des Datei-Manifests: {e}")
+        return _NoCache(pd.DataFrame(columns=INGESTED_FILE_COLUMNS))
+
+# Spaltenreihenfolge der Lese-Funktionen
+SAMPLE_COLUMNS = [
+    "sample_id", "project", "sample_type", "registration_date", "sampling_date",
+    "sampling_location", "sample_condition", "responsible_person"
+]
+CHN_READ_COLUMNS = [
+    "sample_id", "project", "analysis_date",
+    "carbon_percentage", "hydrogen_percentage", "nitrogen_percentage"
+]
+TGA_READ_COLUMNS = [
+    "sample_id", "project", "analysis_date",
+    "moisture", "volatiles_ar", "volatiles_db",
+    "ash_lta_ar", "ash_lta_db", "ash_hta_ar", "ash_hta_db",
+    "fixed_c_ar"
+]
+
+
+def _read_frame(stmt):
+    """Führt ein Core-SELECT aus und liest das Ergebnis spaltenweise in einen DataFrame."""
+    with _connection() as connection:
+        return pd.read_sql(stmt, connection)
+
+
+def _date_range_filter(stmt, column, date_from=None, date_to=None):
+    """
+    Schränkt `stmt` auf einen Datumsbereich (inklusive Grenzen) ein – als reine Bereichsbedingung,
+    damit der Index auf `column` genutzt werden kann.
+
+    Bei DateTime-Spalten schließt ein reines Datum als `date_to` den ganzen Tag ein.
+    """
+    if isinstance(column.type, DateTime):
+        lower, _ = to_datetime_bound(date_from)
+        upper, exclusive = to_datetime_bound(date_to, end=True)
+    else:
+        lower, upper, exclusive = to_date(date_from), to_date(date_to), False
+
+    if lower is not None:
+        stmt = stmt.where(column >= lower)
+    if upper is not None:
+        stmt = stmt.where(column < upper if exclusive else column <= upper)
+    return stmt
+
+
+def _measurement_select(model, columns, sample_id_filter=None, project_filter=None,
+                        date_from=None, date_to=None):
+    """
+    Spaltenprojiziertes SELECT auf eine Messwert-Tabelle inkl. Projekt aus `samples`.
+    Das Projekt kommt direkt aus dem JOIN – es werden keine ORM-Objekte geladen.
+    `date_from`/`date_to` filtern auf `analysis_date`.
+    """
+    selected = [
+        getattr(model, col) if col != "project" else Sample.project
+        for col in columns
+    ]
+    stmt = select(*selected).join(Sample, model.sample_id == Sample.sample_id)
+
+    if sample_id_filter:
+        stmt = stmt.where(model.sample_id.ilike(f"%{sample_id_filter}%"))
+    if project_filter:
+        stmt = stmt.where(Sample.project.ilike(f"%{project_filter}%"))
+    return _date_range_filter(stmt, model.analysis_date, date_from, date_to)
+
+
+@cached_query("samples")
+def fetch_all_samples(sample_id_filter=None, project_filter=None, date_from=None, date_to=None):
+    """Alle Samples; `date_from`/`date_to` filtern auf `registration_date`."""
+    try:
+        stmt = select(*[getattr(Sample, col) for col in SAMPLE_COLUMNS])
         if sample_id_filter:
-            query = query.filter(Sample.sample_id.ilike(f"%{sample_id_filter}%"))
+            stmt = stmt.where(Sample.sample_id.ilike(f"%{sample_id_filter}%"))
         if project_filter:
-            query = query.filter(Sample.project.ilike(f"%{project_filter}%"))
-        entries = query.all()
-        columns_order = [
-            "sample_id", "project", "sample_type", "registration_date", "sampling_date",
-            "sampling_location", "sample_condition", "responsible_person"
-        ]
+            stmt = stmt.where(Sample.project.ilike(f"%{project_filter}%"))
+        stmt = _date_range_filter(stmt, Sample.registration_date, date_from, date_to)
 
-        return pd.DataFrame([{k: v for k, v in vars(e).items() if not k.startswith('_')} for e in entries])[
-            columns_order]
+        return _read_frame(stmt)
 
     except Exception as e:
         logging.error(f"❌ Fehler beim Laden der Sample-Daten: {e}")
-        return pd.DataFrame()
-    finally:
-        session.close()
+        return _NoCache(pd.DataFrame())
 
-def fetch_all_chn_data(sample_id_filter=None, project_filter=None):
-    session = get_session()
+@cached_query("samples", "chn_data")
+def fetch_all_chn_data(sample_id_filter=None, project_filter=None, date_from=None, date_to=None, derived=False):
+    """Alle CHN-Daten; mit `derived=True` inkl. abgeleiteter Größen (siehe services.derived)."""
     try:
-        query = session.query(CHNData).join(Sample, CHNData.sample_id == Sample.sample_id)
-
-        if project_filter:
-            query = query.filter(Sample.project.ilike(f"%{project_filter}%"))
-        if sample_id_filter:
-            query = query.filter(CHNData.sample_id.ilike(f"%{sample_id_filter}%"))
-
-        results = query.all()
+        df = _read_frame(_measurement_select(
+            CHNData, CHN_READ_COLUMNS, sample_id_filter, project_filter, date_from, date_to
+        ))
 
         # Falls keine Ergebnisse vorhanden sind, Info ausgeben und leeren DataFrame zurückgeben
-        if not results:
+        if df.empty:
             logging.error("❌ Keine Daten verfügbar!")
             st.write("No CHN-Data available!")
-            return pd.DataFrame()  # Rückgabe eines leeren DataFrames statt None
-
-        data = []
-        for entry in results:
-            row = {
-                "sample_id": entry.sample_id,
-                "project": entry.sample.project if entry.sample else None,
-                "analysis_date": entry.analysis_date,
-                "carbon_percentage": entry.carbon_percentage,
-                "hydrogen_percentage": entry.hydrogen_percentage,
-                "nitrogen_percentage": entry.nitrogen_percentage,
-            }
-            data.append(row)
-
-        df = pd.DataFrame(data)
-
-        # Optionale Spaltenreihenfolge
-        columns_order = [
-            "sample_id", "project", "analysis_date",
-            "carbon_percentage", "hydrogen_percentage", "nitrogen_percentage"
-        ]
-        if not df.empty:
-            df = df[columns_order]
-            return df
+            return _NoCache(pd.DataFrame())  # Rückgabe eines leeren DataFrames statt None
+
+        return add_derived_columns(df) if derived else df
 
     except Exception as e:
         logging.error(f"❌ Fehler beim Laden der CHN-Daten mit Projektinfo: {e}")
-        return pd.DataFrame()  # Rückgabe eines leeren DataFrames im Fehlerfall
-    finally:
-        session.close()
+        return _NoCache(pd.DataFrame())  # Rückgabe eines leeren DataFrames im Fehlerfall
 
 
-def fetch_all_eltra_tga_data(sample_id_filter=None, project_filter=None):
-    session = get_session()
+@cached_query("samples", "eltra_tga_data")
+def fetch_all_eltra_tga_data(sample_id_filter=None, project_filter=None, date_from=None, date_to=None,
+                             derived=False):
+    """Alle ELTRA-TGA-Daten; mit `derived=True` inkl. abgeleiteter Größen (siehe services.derived)."""
     try:
-        query = session.query(EltraTGAData).join(Sample, EltraTGAData.sample_id == Sample.sample_id)
-
-        if sample_id_filter:
-            query = query.filter(EltraTGAData.sample_id.ilike(f"%{sample_id_filter}%"))
-        if project_filter:
-            query = query.filter(Sample.project.ilike(f"%{project_filter}%"))
-
-        results = query.all()
+        df = _read_frame(_measurement_select(
+            EltraTGAData, TGA_READ_COLUMNS, sample_id_filter, project_filter, date_from, date_to
+        ))
 
         # Falls keine Ergebnisse vorhanden sind, Info ausgeben und leeren DataFrame zurückgeben
-        if not results:
+        if df.empty:
             logging.error("❌ Keine Daten verfügbar!")
             st.write("No ELTRA TGA-Data available!")
-            return pd.DataFrame()  # Rückgabe eines leeren DataFrames statt None
-
-        data = []
-        for entry in results:
-            row = {
-                "sample_id": entry.sample_id,
-                "project": entry.sample.project if entry.sample else None,
-                "analysis_date": entry.analysis_date,
-                "moisture": entry.moisture,
-                "volatiles_ar": entry.volatiles_ar,
-                "volatiles_db": entry.volatiles_db,
-                "ash_lta_ar": entry.ash_lta_ar,
-                "ash_lta_db": entry.ash_lta_db,
-                "ash_hta_ar": entry.ash_hta_ar,
-                "ash_hta_db": entry.ash_hta_db,
-                "fixed_c_ar": entry.fixed_c_ar,
-            }
-            data.append(row)
-
-        df = pd.DataFrame(data)
-
-        columns_order = [
-            "sample_id", "project", "analysis_date",
-            "moisture", "volatiles_ar", "volatiles_db",
-            "ash_lta_ar", "ash_lta_db", "ash_hta_ar", "ash_hta_db",
-            "fixed_c_ar"
+            return _NoCache(pd.DataFrame())  # Rückgabe eines leeren DataFrames statt None
+
+        return add_derived_columns(df) if derived else df
+
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden der Eltra-TGA-Daten mit Projektinfo: {e}")
+        return _NoCache(pd.DataFrame())
+
+
+# -------------------------------
+# 📄 Seitenweise Abfragen (Server-seitige Filter)
+# -------------------------------
+DEFAULT_PAGE_SIZE = 50
+
+
+def _apply_filters(stmt, sample_id_column, date_column, project=None, sample_id=None,
+                   date_from=None, date_to=None):
+    """Filter der Datenseiten (exaktes Projekt bzw. exakte Sample-ID, Datumsbereich)."""
+    if project:
+        stmt = stmt.where(Sample.project == project)
+    if sample_id:
+        stmt = stmt.where(sample_id_column == sample_id)
+    return _date_range_filter(stmt, date_column, date_from, date_to)
+
+
+def _fetch_page(stmt, sample_id_column, date_column, tiebreaker, page, page_size, sort_by, ascending,
+                project=None, sample_id=None, date_from=None, date_to=None):
+    """
+    Filtert, sortiert und begrenzt ein SELECT in der Datenbank und liefert nur eine Seite.
+
+    Returns:
+        tuple[pd.DataFrame, int]: Zeilen der angeforderten Seite und Gesamtanzahl der Treffer.
+    """
+    stmt = _apply_filters(stmt, sample_id_column, date_column, project, sample_id, date_from, date_to)
+
+    sort_column = stmt.selected_columns[sort_by] if sort_by in stmt.selected_columns else tiebreaker
+    order = sort_column.asc() if ascending else sort_column.desc()
+    page = max(int(page), 1)
+    page_size = max(int(page_size), 1)
+
+    with _connection() as connection:
+        total = connection.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+        paged = stmt.order_by(order, tiebreaker).limit(page_size).offset((page - 1) * page_size)
+        df = pd.read_sql(paged, connection)
+    return df, total
+
+
+@cached_query("samples")
+def fetch_samples_page(page=1, page_size=DEFAULT_PAGE_SIZE, sort_by="sample_id", ascending=True,
+                       project=None, sample_id=None, date_from=None, date_to=None):
+    """Eine Seite registrierter Samples; `date_from`/`date_to` filtern auf `registration_date`."""
+    try:
+        stmt = select(*[getattr(Sample, col) for col in SAMPLE_COLUMNS])
+        return _fetch_page(
+            stmt, Sample.sample_id, Sample.registration_date, Sample.sample_id,
+            page, page_size, sort_by, ascending, project, sample_id, date_from, date_to
+        )
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden der Sample-Daten: {e}")
+        return _NoCache((pd.DataFrame(), 0))
+
+
+@cached_query("samples", "chn_data")
+def fetch_chn_data_page(page=1, page_size=DEFAULT_PAGE_SIZE, sort_by="sample_id", ascending=True,
+                        project=None, sample_id=None, date_from=None, date_to=None, derived=False):
+    """Eine Seite CHN-Daten; `date_from`/`date_to` filtern auf `analysis_date`, `derived` ergänzt abgeleitete Größen."""
+    try:
+        df, total = _fetch_page(
+            _measurement_select(CHNData, CHN_READ_COLUMNS), CHNData.sample_id, CHNData.analysis_date, CHNData.id,
+            page, page_size, sort_by, ascending, project, sample_id, date_from, date_to
+        )
+        return (add_derived_columns(df) if derived else df), total
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden der CHN-Daten: {e}")
+        return _NoCache((pd.DataFrame(), 0))
+
+
+@cached_query("samples", "eltra_tga_data")
+def fetch_eltra_tga_data_page(page=1, page_size=DEFAULT_PAGE_SIZE, sort_by="sample_id", ascending=True,
+                              project=None, sample_id=None, date_from=None, date_to=None, derived=False):
+    """Eine Seite ELTRA-TGA-Daten; `date_from`/`date_to` filtern auf `analysis_date`, `derived` ergänzt abgeleitete Größen."""
+    try:
+        df, total = _fetch_page(
+            _measurement_select(EltraTGAData, TGA_READ_COLUMNS), EltraTGAData.sample_id,
+            EltraTGAData.analysis_date, EltraTGAData.id,
+            page, page_size, sort_by, ascending, project, sample_id, date_from, date_to
+        )
+        return (add_derived_columns(df) if derived else df), total
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden der Eltra-TGA-Daten: {e}")
+        return _NoCache((pd.DataFrame(), 0))
+
+
+@cached_query("samples", "chn_data", "eltra_tga_data")
+def fetch_projects(table="samples"):
+    """
+    Liefert die Projektnamen für Filter-Auswahllisten.
+
+    Args:
+        table (str): "samples", "chn_data" oder "eltra_tga_data" – nur Projekte mit Einträgen
+                     in dieser Tabelle werden geliefert.
+    """
+    try:
+        stmt = select(Sample.project).where(Sample.project.isnot(None)).distinct().order_by(Sample.project)
+        if table != "samples":
+            model = _MEASUREMENT_MODELS[table]
+            stmt = stmt.where(select(model.id).where(model.sample_id == Sample.sample_id).exists())
+        with _connection() as connection:
+            return connection.execute(stmt).scalars().all()
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden der Projekte: {e}")
+        return _NoCache([])
+
+
+@cached_query("samples", "chn_data", "eltra_tga_data")
+def fetch_sample_ids(table="samples", project=None):
+    """Liefert die sample_ids (optional eines Projekts) für Filter-Auswahllisten."""
+    try:
+        if table == "samples":
+            stmt = select(Sample.sample_id)
+        else:
+            model = _MEASUREMENT_MODELS[table]
+            stmt = select(model.sample_id).join(Sample, model.sample_id == Sample.sample_id).distinct()
+        if project:
+            stmt = stmt.where(Sample.project == project)
+        stmt = stmt.order_by(stmt.selected_columns[0])
+        with _connection() as connection:
+            return connection.execute(stmt).scalars().all()
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden der Sample-IDs: {e}")
+        return _NoCache([])
+
+
+# -------------------------------
+# 🏷️ Streaming für Massen-Exporte
+# -------------------------------
+STREAM_BATCH_SIZE = 1000
+
+
+def _sample_range_select(project=None, sample_id_from=None, sample_id_to=None):
+    """SELECT auf `samples` für ein Projekt und/oder einen sample_id-Bereich (inklusive Grenzen)."""
+    stmt = select(*[getattr(Sample, col) for col in SAMPLE_COLUMNS])
+    if project:
+        stmt = stmt.where(Sample.project == project)
+    if sample_id_from:
+        stmt = stmt.where(Sample.sample_id >= sample_id_from)
+    if sample_id_to:
+        stmt = stmt.where(Sample.sample_id <= sample_id_to)
+    return stmt.order_by(Sample.sample_id)
+
+
+@cached_query("samples")
+def count_samples(project=None, sample_id_from=None, sample_id_to=None):
+    """Anzahl der Samples für die Auswahl eines Massen-Exports."""
+    try:
+        stmt = _sample_range_select(project, sample_id_from, sample_id_to).order_by(None)
+        with _connection() as connection:
+            return connection.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Zählen der Samples: {e}")
+        return _NoCache(0)
+
+
+def iter_samples(project=None, sample_id_from=None, sample_id_to=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Liefert die ausgewählten Samples zeilenweise (als Mapping), ohne das Ergebnis zu materialisieren.
+
+    Auf PostgreSQL wird ein Server-seitiger Cursor verwendet, der jeweils `batch_size` Zeilen
+    holt; SQLite liest ohnehin schrittweise aus dem Cursor.
+    """
+    stmt = _sample_range_select(project, sample_id_from, sample_id_to)
+    # Eigene Connection: der Generator wird u. U. erst im Download-Callback (anderer Thread) gelesen
+    with engine.connect() as connection:
+        if connection.dialect.supports_server_side_cursors:
+            connection = connection.execution_options(stream_results=True, yield_per=batch_size)
+        for row in connection.execute(stmt).mappings():
+            yield row
+
+
+# Zeilen je DataFrame-Block beim Streamen ganzer Tabellen
+STREAM_CHUNK_SIZE = 10000
+
+
+def _stream_frames(stmt, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Liefert das Ergebnis von `stmt` als DataFrame-Blöcke zu je `chunk_size` Zeilen.
+
+    PostgreSQL: Server-seitiger Cursor (`stream_results`/`yield_per`); SQLite: blockweises
+    `fetchmany` auf dem Cursor. Es liegt immer nur ein Block im Speicher. Bei leerem Ergebnis
+    wird ein leerer DataFrame mit den Spalten geliefert (z. B. für die CSV-Kopfzeile).
+    """
+    with engine.connect() as connection:
+        if connection.dialect.supports_server_side_cursors:
+            connection = connection.execution_options(stream_results=True, yield_per=chunk_size)
+        result = connection.execute(stmt)
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions(chunk_size):
+            empty = False
+            yield pd.DataFrame.from_records(rows, columns=columns)
+        if empty:
+            yield pd.DataFrame(columns=columns)
+
+
+def iter_chn_data(project=None, sample_id=None, date_from=None, date_to=None, derived=False,
+                  chunk_size=STREAM_CHUNK_SIZE):
+    """CHN-Daten (Filter wie `fetch_chn_data_page`) als DataFrame-Blöcke, sortiert nach Sample-ID."""
+    stmt = _apply_filters(
+        _measurement_select(CHNData, CHN_READ_COLUMNS), CHNData.sample_id, CHNData.analysis_date,
+        project, sample_id, date_from, date_to
+    )
+    frames = _stream_frames(stmt.order_by(CHNData.sample_id, CHNData.id), chunk_size)
+    return map(add_derived_columns, frames) if derived else frames
+
+
+def iter_eltra_tga_data(project=None, sample_id=None, date_from=None, date_to=None, derived=False,
+                        chunk_size=STREAM_CHUNK_SIZE):
+    """ELTRA-TGA-Daten (Filter wie `fetch_eltra_tga_data_page`) als DataFrame-Blöcke, sortiert nach Sample-ID."""
+    stmt = _apply_filters(
+        _measurement_select(EltraTGAData, TGA_READ_COLUMNS), EltraTGAData.sample_id, EltraTGAData.analysis_date,
+        project, sample_id, date_from, date_to
+    )
+    frames = _stream_frames(stmt.order_by(EltraTGAData.sample_id, EltraTGAData.id), chunk_size)
+    return map(add_derived_columns, frames) if derived else frames
+
+
+# -------------------------------
+# 📊 Replikat-Statistik (Aggregation in der Datenbank)
+# -------------------------------
+# Messgrößen je Tabelle (alles außer Sample-ID, Projekt und Analysedatum)
+CHN_MEASURES = CHN_READ_COLUMNS[3:]
+TGA_MEASURES = TGA_READ_COLUMNS[3:]
+
+# Gruppierung: je Sample (inkl. Projekt) oder je Projekt
+STATISTICS_GROUPS = ("sample", "project")
+
+
+def _statistics_select(model, measures, group_by, dialect_name):
+    """
+    GROUP-BY-Abfrage mit Anzahl, Mittelwert und Varianz-Grundlage je Messgröße.
+
+    PostgreSQL liefert die Stichprobenvarianz direkt (`var_samp`); andere Datenbanken
+    (SQLite) liefern die Quadratsumme, die Varianz wird daraus in `_finish_statistics` berechnet.
+    """
+    if group_by == "sample":
+        groups = [model.sample_id.label("sample_id"), Sample.project.label("project")]
+    elif group_by == "project":
+        groups = [Sample.project.label("project"), func.count(func.distinct(model.sample_id)).label("samples")]
+    else:
+        raise ValueError(f"group_by muss eine von {STATISTICS_GROUPS} sein, nicht {group_by!r}")
+
+    aggregates = [func.count().label("n")]
+    for measure in measures:
+        column = getattr(model, measure)
+        aggregates += [
+            func.count(column).label(f"{measure}__n"),
+            func.avg(column).label(f"{measure}__mean"),
+            func.var_samp(column).label(f"{measure}__var") if dialect_name == "postgresql"
+            else func.sum(column * column).label(f"{measure}__sumsq"),
         ]
 
-        if not df.empty:
-            df = df[columns_order]
-            return df
+    group_columns = [model.sample_id, Sample.project] if group_by == "sample" else [Sample.project]
+    return (
+        select(*groups, *aggregates)
+        .join(Sample, model.sample_id == Sample.sample_id)
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+    )
+
+
+def _finish_statistics(df, measures):
+    """Leitet aus den aggregierten Zeilen Standardabweichung und RSD (%) je Messgröße ab."""
+    result = df.drop(columns=[col for col in df.columns if "__" in col])
+    for measure in measures:
+        n = df[f"{measure}__n"]
+        mean = df[f"{measure}__mean"].astype(float)
+        if f"{measure}__var" in df.columns:
+            var = df[f"{measure}__var"].astype(float)
+        else:
+            sumsq = df[f"{measure}__sumsq"].astype(float)
+            var = ((sumsq - n * mean ** 2) / (n - 1)).where(n > 1)
+        std = var.clip(lower=0) ** 0.5
+        result[f"{measure}_mean"] = mean
+        result[f"{measure}_std"] = std
+        result[f"{measure}_rsd"] = (std / mean.abs() * 100).where(mean != 0)
+    return result
+
+
+def _replicate_statistics(model, measures, group_by, project=None, sample_id=None, date_from=None, date_to=None):
+    with _connection() as connection:
+        stmt = _statistics_select(model, measures, group_by, connection.dialect.name)
+        stmt = _apply_filters(stmt, model.sample_id, model.analysis_date, project, sample_id, date_from, date_to)
+        df = pd.read_sql(stmt, connection)
+    return _finish_statistics(df, measures)
+
+
+@cached_query("samples", "chn_data")
+def fetch_chn_statistics(group_by="sample", project=None, sample_id=None, date_from=None, date_to=None):
+    """
+    Replikat-Statistik der CHN-Daten je Sample oder Projekt: Anzahl Messungen (`n`) sowie
+    `<messgröße>_mean`, `_std` und `_rsd` (%). Es werden nur die aggregierten Zeilen geladen.
+    """
+    try:
+        return _replicate_statistics(CHNData, CHN_MEASURES, group_by, project, sample_id, date_from, date_to)
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Berechnen der CHN-Statistik: {e}")
+        return _NoCache(pd.DataFrame())
 
 
+@cached_query("samples", "eltra_tga_data")
+def fetch_tga_statistics(group_by="sample", project=None, sample_id=None, date_from=None, date_to=None):
+    """Replikat-Statistik der ELTRA-TGA-Daten – wie `fetch_chn_statistics`."""
+    try:
+        return _replicate_statistics(EltraTGAData, TGA_MEASURES, group_by, project, sample_id, date_from, date_to)
     except Exception as e:
-        logging.error(f"❌ Fehler beim Laden der Eltra-TGA-Daten mit Projektinfo: {e}")
-        return pd.DataFrame()
-    finally:
-        session.close()
\ No newline at end of file
+        logging.error(f"❌ Fehler beim Berechnen der ELTRA-TGA-Statistik: {e}")
+        return _NoCache(pd.DataFrame())
+
+
+# -------------------------------
+# 🧮 Replikat-Zusammenfassung je Sample (sample_summary)
+# -------------------------------
+# Präfix der Spalten in `sample_summary` je Messwert-Tabelle
+_SUMMARY_SOURCES = {
+    "chn": (CHNData, CHN_MEASURES),
+    "tga": (EltraTGAData, TGA_MEASURES),
+}
+
+
+def _summary_columns(prefix):
+    measures = _SUMMARY_SOURCES[prefix][1]
+    return [f"{prefix}_n"] + [f"{m}_{stat}" for m in measures for stat in ("mean", "std")]
+
+
+def _summary_frame(connection, prefix, sample_ids=None):
+    """Aggregate eines Geräts je Sample in den Spalten von `sample_summary` (alle oder nur `sample_ids`)."""
+    model, measures = _SUMMARY_SOURCES[prefix]
+    stmt = _statistics_select(model, measures, "sample", connection.dialect.name)
+    if sample_ids is None:
+        frames = [pd.read_sql(stmt, connection)]
+    else:
+        frames = [pd.read_sql(stmt.where(model.sample_id.in_(chunk)), connection) for chunk in _chunks(sample_ids)]
+    df = _finish_statistics(pd.concat(frames, ignore_index=True), measures)
+    return df.rename(columns={"n": f"{prefix}_n"})[["sample_id"] + _summary_columns(prefix)]
+
+
+def _write_summary(session, prefix, df, sample_ids):
+    """Upsert der Spalten eines Geräts; Samples ohne Messwerte erhalten n = 0 und leere Werte."""
+    columns = _summary_columns(prefix)
+    missing = sorted(set(sample_ids) - set(df["sample_id"]))
+    if missing:
+        empty = pd.DataFrame({"sample_id": missing, f"{prefix}_n": 0})
+        df = pd.concat([df, empty], ignore_index=True)
+    if df.empty:
+        return 0
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+    for record in records:
+        record["updated_at"] = now
+
+    dialect_insert = _dialect_insert(session.bind.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(SampleSummary)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sample_id"],
+            set_={column: stmt.excluded[column] for column in columns + ["updated_at"]}
+        )
+        session.execute(stmt, records)
+    else:
+        # Andere Datenbanken: vorhandene Zeilen aktualisieren, fehlende anlegen
+        for record in records:
+            session.merge(SampleSummary(**record))
+        session.flush()
+    return len(records)
+
+
+def _refresh_sample_summary(session, model, sample_ids):
+    """Kern von `refresh_sample_summary` – läuft in der Transaktion von `session`."""
+    if not sample_ids:
+        return 0
+    prefix = next(prefix for prefix, (source, _) in _SUMMARY_SOURCES.items() if source is model)
+    session.flush()
+    df = _summary_frame(session.connection(), prefix, sample_ids)
+    return _write_summary(session, prefix, df, sample_ids)
+
+
+def refresh_sample_summary(table, sample_ids):
+    """
+    Berechnet die Zusammenfassung eines Geräts (`"chn_data"`/`"eltra_tga_data"`) für einzelne Samples neu.
+    Der Import ruft das automatisch in seiner Transaktion auf.
+    """
+    try:
+        with unit_of_work() as session:
+            count = _refresh_sample_summary(session, _MEASUREMENT_MODELS[table], list(sample_ids))
+            mark_changed(session, SampleSummary.__tablename__)
+            return count
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Aktualisieren der Sample-Zusammenfassung: {e}")
+        return None
+
+
+def _rebuild_sample_summary(session):
+    """Kern von `rebuild_sample_summary` – läuft in der Transaktion von `session`."""
+    session.execute(SampleSummary.__table__.delete())
+    for prefix in _SUMMARY_SOURCES:
+        _write_summary(session, prefix, _summary_frame(session.connection(), prefix), [])
+    return session.execute(select(func.count()).select_from(SampleSummary)).scalar_one()
+
+
+def rebuild_sample_summary():
+    """Baut `sample_summary` vollständig aus den Messwert-Tabellen neu auf. Returns: Anzahl Samples."""
+    try:
+        with unit_of_work() as session:
+            count = _rebuild_sample_summary(session)
+            mark_changed(session, SampleSummary.__tablename__)
+            logging.info(f"🧮 Sample-Zusammenfassung neu aufgebaut ({count} Samples)")
+            return count
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Neuaufbau der Sample-Zusammenfassung: {e}")
+        return None
+
+
+def check_sample_summary(rtol=1e-9):
+    """
+    Vergleicht `sample_summary` mit frisch berechneten Aggregaten.
+
+    Returns:
+        pd.DataFrame: Eine Zeile je Abweichung (`sample_id`, `column`, `stored`, `expected`);
+        leer, wenn die Tabelle konsistent ist.
+    """
+    columns = [column for prefix in _SUMMARY_SOURCES for column in _summary_columns(prefix)]
+    with _connection() as connection:
+        stored = pd.read_sql(select(*[getattr(SampleSummary, c) for c in ["sample_id"] + columns]), connection)
+        expected = None
+        for prefix in _SUMMARY_SOURCES:
+            df = _summary_frame(connection, prefix)
+            expected = df if expected is None else expected.merge(df, on="sample_id", how="outer")
+
+    # Samples ohne Messwerte eines Geräts zählen mit n = 0
+    for prefix in _SUMMARY_SOURCES:
+        expected[f"{prefix}_n"] = expected[f"{prefix}_n"].fillna(0)
+    merged = stored.merge(expected, on="sample_id", how="outer", suffixes=("_stored", "_expected"), indicator=True)
+
+    mismatches = []
+    for column in columns:
+        left = pd.to_numeric(merged[f"{column}_stored"], errors="coerce")
+        right = pd.to_numeric(merged[f"{column}_expected"], errors="coerce")
+        both_missing = left.isna() & right.isna()
+        close = (left - right).abs() <= rtol * right.abs().clip(lower=1)
+        differs = ~(both_missing | close.fillna(False))
+        # Zeilen nur mit n = 0 in der Tabelle, aber ohne Messwerte: konsistent
+        if column.endswith("_n"):
+            differs &= ~((left == 0) & right.isna())
+        for _, row in merged[differs].iterrows():
+            mismatches.append({
+                "sample_id": row["sample_id"], "column": column,
+                "stored": row[f"{column}_stored"], "expected": row[f"{column}_expected"],
+            })
+    result = pd.DataFrame(mismatches, columns=["sample_id", "column", "stored", "expected"])
+    return result.sort_values("sample_id", kind="stable", ignore_index=True)
+
+
+# -------------------------------
+# 📋 Sample-Report (Stammdaten + Replikat-Mittelwerte, eine Zeile je Sample)
+# -------------------------------
+def _sample_report_select(measured_only=False):
+    """
+    Ein SELECT über `samples` LEFT JOIN `sample_summary` – Stammdaten, CHN- und TGA-Mittelwerte
+    nebeneinander. Samples ohne Messwerte erscheinen mit n = 0 (außer bei `measured_only`).
+    """
+    summary_columns = []
+    for prefix in _SUMMARY_SOURCES:
+        for column in _summary_columns(prefix):
+            attribute = getattr(SampleSummary, column)
+            summary_columns.append(func.coalesce(attribute, 0).label(column) if column == f"{prefix}_n" else attribute)
+
+    stmt = (
+        select(*[getattr(Sample, col) for col in SAMPLE_COLUMNS], *summary_columns)
+        .select_from(Sample)
+        .outerjoin(SampleSummary, SampleSummary.sample_id == Sample.sample_id)
+    )
+    if measured_only:
+        stmt = stmt.where((SampleSummary.chn_n > 0) | (SampleSummary.tga_n > 0))
+    return stmt
+
+
+def _report_derived(df):
+    return add_derived_columns(df, suffix="_mean")
+
+
+@cached_query("samples", "sample_summary")
+def fetch_sample_report_page(page=1, page_size=DEFAULT_PAGE_SIZE, sort_by="sample_id", ascending=True,
+                             project=None, sample_id=None, date_from=None, date_to=None, measured_only=False,
+                             derived=False):
+    """
+    Eine Seite des Sample-Reports; `date_from`/`date_to` filtern auf `registration_date`.
+    `derived` ergänzt die abgeleiteten Größen aus den Replikat-Mittelwerten (Spalten `…_mean`).
+    """
+    try:
+        df, total = _fetch_page(
+            _sample_report_select(measured_only), Sample.sample_id, Sample.registration_date, Sample.sample_id,
+            page, page_size, sort_by, ascending, project, sample_id, date_from, date_to
+        )
+        return (_report_derived(df) if derived else df), total
+    except Exception as e:
+        logging.error(f"❌ Fehler beim Laden des Sample-Reports: {e}")
+        return _NoCache((pd.DataFrame(), 0))
+
+
+def iter_sample_report(project=None, sample_id=None, date_from=None, date_to=None, measured_only=False,
+                       derived=False, chunk_size=STREAM_CHUNK_SIZE):
+    """Der gesamte Sample-Report (Filter wie `fetch_sample_report_page`) als DataFrame-Blöcke."""
+    stmt = _apply_filters(
+        _sample_report_select(measured_only), Sample.sample_id, Sample.registration_date,
+        project, sample_id, date_from, date_to
+    )
+    frames = _stream_frames(stmt.order_by(Sample.sample_id), chunk_size)
+    return map(_report_derived, frames) if derived else frames
+
+
+_MEASUREMENT_MODELS = {
+    "chn_data": CHNData,
+    "eltra_tga_data": EltraTGAData,
+}
@@ -0,0 +1,104 @@
+import datetime
+import pandas as pd
+
+
+# Bekannte Datumsformate der Geräte-Exporte (ELTRA: deutsch, CHN-Analyzer: US/ISO).
+# Die Formate werden der Reihe nach probiert; nur noch nicht erkannte Werte gehen weiter.
+INSTRUMENT_DATE_FORMATS = [
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%Y %I:%M %p",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y",
+]
+
+
+def parse_instrument_dates(values, dayfirst=True):
+    """
+    Wandelt Datums-Strings aus Gerätedateien vektorisiert in Zeitstempel um.
+
+    Jeder unterschiedliche Wert wird nur einmal geparst (Gerätedateien enthalten meist nur
+    wenige verschiedene Zeitpunkte) und das Ergebnis anschließend auf alle Zeilen abgebildet.
+
+    Args:
+        values: Iterable/Series mit Strings, datetime-Objekten oder None.
+        dayfirst (bool): Auslegung mehrdeutiger Werte, die keinem bekannten Format entsprechen.
+
+    Returns:
+        pd.Series: datetime64-Werte (zeitzonenfrei); nicht erkennbare Werte sind NaT.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.tz_localize(None) if series.dt.tz is not None else series
+
+    strings = series.astype("string").str.strip()
+    unique = pd.Series(strings.dropna().unique(), dtype="string")
+    unique = unique[unique != ""]
+    if unique.empty:
+        # Nur leere Werte – `map` auf eine leere Lookup-Tabelle liefert kein datetime64
+        return pd.Series(pd.NaT, index=series.index, name=series.name, dtype="datetime64[ns]")
+
+    parsed = pd.Series(pd.NaT, index=unique.index, dtype="datetime64[ns]")
+    for date_format in INSTRUMENT_DATE_FORMATS:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(unique[pending], format=date_format, errors="coerce")
+
+    pending = parsed.isna()
+    if pending.any():
+        parsed[pending] = pd.to_datetime(
+            unique[pending], format="mixed", dayfirst=dayfirst, errors="coerce", utc=True
+        ).dt.tz_localize(None)
+
+    lookup = pd.Series(parsed.to_numpy(), index=unique.to_numpy())
+    result = strings.map(lookup)
+    return pd.Series(result.to_numpy(dtype="datetime64[ns]"), index=series.index, name=series.name)
+
+
+def parse_instrument_date(value, dayfirst=True):
+    """Einzelwert-Variante von `parse_instrument_dates` – liefert datetime oder None."""
+    parsed = parse_instrument_dates([value], dayfirst=dayfirst).iloc[0]
+    return None if pd.isna(parsed) else parsed.to_pydatetime()
+
+
+def to_datetime_bound(value, end=False):
+    """
+    Macht aus einer Filtergrenze (date, datetime oder String) einen Zeitstempel für Bereichsabfragen.
+
+    Für `end=True` wird ein reines Datum auf den Beginn des Folgetags gesetzt, damit
+    `column < bound` den ganzen Tag einschließt.
+
+    Returns:
+        tuple[datetime.datetime | None, bool]: Grenze und ob sie exklusiv (`<`) zu vergleichen ist.
+    """
+    if value is None or value == "":
+        return None, False
+    if isinstance(value, datetime.datetime):
+        return value, False
+    if isinstance(value, datetime.date):
+        bound = datetime.datetime.combine(value, datetime.time())
+        return (bound + datetime.timedelta(days=1), True) if end else (bound, False)
+
+    parsed = pd.Timestamp(value)
+    if end and parsed == parsed.normalize() and len(str(value).strip()) <= 10:
+        return (parsed + pd.Timedelta(days=1)).to_pydatetime(), True
+    return parsed.to_pydatetime(), False
+
+
+def to_date(value):
+    """date, datetime oder ISO-String → date (None bleibt None)."""
+    if value is None or value == "" or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return pd.Timestamp(value).date()
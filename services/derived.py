@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+
+# Molmassen (g/mol) für atomare Verhältnisse
+ATOMIC_MASS = {"C": 12.011, "H": 1.008, "N": 14.007}
+
+
+def _ratio(numerator, denominator):
+    # Division über ganze Spalten; Nenner ≤ 0 oder fehlend → NaN statt inf/Fehler
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    result = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return result
+
+
+def _volatiles_daf(c):
+    return _ratio(c("volatiles_db") * 100, 100 - c("ash_hta_db"))
+
+
+def _fixed_c_db(c):
+    return 100 - c("volatiles_db") - c("ash_hta_db")
+
+
+def _fixed_c_daf(c):
+    return _ratio(_fixed_c_db(c) * 100, 100 - c("ash_hta_db"))
+
+
+def _atomic_h_c(c):
+    return _ratio(c("hydrogen_percentage") / ATOMIC_MASS["H"], c("carbon_percentage") / ATOMIC_MASS["C"])
+
+
+def _atomic_n_c(c):
+    return _ratio(c("nitrogen_percentage") / ATOMIC_MASS["N"], c("carbon_percentage") / ATOMIC_MASS["C"])
+
+
+# Abgeleitete Größe → (benötigte Spalten, Berechnung). Die Berechnung erhält eine Funktion,
+# die eine Spalte als float-Array liefert, und arbeitet immer auf dem ganzen DataFrame.
+DERIVED_QUANTITIES = {
+    # Flüchtige Bestandteile wasser- und aschefrei (daf): Vd · 100 / (100 − A_d)
+    "volatiles_daf": (["volatiles_db", "ash_hta_db"], _volatiles_daf),
+    # Fixer Kohlenstoff wasserfrei (db): 100 − Vd − A_d
+    "fixed_c_db": (["volatiles_db", "ash_hta_db"], _fixed_c_db),
+    # Fixer Kohlenstoff wasser- und aschefrei (daf): FC_d · 100 / (100 − A_d)
+    "fixed_c_daf": (["volatiles_db", "ash_hta_db"], _fixed_c_daf),
+    # Atomare Verhältnisse aus den CHN-Massenanteilen
+    "atomic_h_c": (["hydrogen_percentage", "carbon_percentage"], _atomic_h_c),
+    "atomic_n_c": (["nitrogen_percentage", "carbon_percentage"], _atomic_n_c),
+}
+
+
+def available_quantities(columns, suffix=""):
+    """Abgeleitete Größen, deren Eingangsspalten (mit `suffix`, z. B. `_mean`) vorhanden sind."""
+    columns = set(columns)
+    return [
+        name for name, (required, _) in DERIVED_QUANTITIES.items()
+        if all(f"{column}{suffix}" in columns for column in required)
+    ]
+
+
+def add_derived_columns(df, quantities=None, suffix=""):
+    """
+    Ergänzt abgeleitete Größen als neue Spalten – vektorisiert über den ganzen DataFrame.
+
+    Args:
+        df (pd.DataFrame): Messwerte (Spalten wie in `eltra_tga_data`/`chn_data`).
+        quantities: Namen aus `DERIVED_QUANTITIES`; Standard: alle, deren Eingangsspalten vorhanden sind.
+        suffix (str): Spaltensuffix der Eingangs- und Ergebnisspalten, z. B. `_mean` für den Sample-Report.
+
+    Returns:
+        pd.DataFrame: Kopie von `df` mit den zusätzlichen Spalten.
+    """
+    if quantities is None:
+        quantities = available_quantities(df.columns, suffix)
+
+    def column(name):
+        return pd.to_numeric(df[f"{name}{suffix}"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    derived = {}
+    for name in quantities:
+        required, compute = DERIVED_QUANTITIES[name]
+        missing = [f"{col}{suffix}" for col in required if f"{col}{suffix}" not in df.columns]
+        if missing:
+            raise KeyError(f"Spalten für '{name}' fehlen: {', '.join(missing)}")
+        derived[f"{name}{suffix}"] = compute(column)
+
+    return df.assign(**derived)
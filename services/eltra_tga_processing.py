@@ -1,31 +1,163 @@
 import pandas as pd
+import numpy as np
 import streamlit as st
 import re
+import io
+import math
+from array import array
+from itertools import islice
+from services.dates import parse_instrument_date
+
+
+# Bei jeder Änderung am Parser erhöhen – gecachte Parse-Ergebnisse werden damit ungültig
+PARSER_VERSION = 3
+
+# Spalten der ELTRA-Ergebnisdatei und ihre Namen in der Datenbank
+TGA_COLUMN_MAP = {
+    'Id': 'sample_id',
+    'Moisture': 'moisture',
+    'Va': 'volatiles_ar',
+    'Aa_LTA': 'ash_lta_ar',
+    'Aa_HTA': 'ash_hta_ar',
+    'Vd': 'volatiles_db',
+    'Ad_LTA': 'ash_lta_db',
+    'Ad_HTA': 'ash_hta_db',
+    'FCa': 'fixed_c_ar'
+}
+TGA_OUTPUT_COLUMNS = [
+    'sample_id', 'analysis_date', 'moisture', 'volatiles_ar', 'ash_lta_ar', 'ash_hta_ar',
+    'volatiles_db', 'ash_lta_db', 'ash_hta_db', 'fixed_c_ar'
+]
+TGA_HEADER_IDENTIFIERS = [
+    "Tga Version:",
+    "Analyse durchgeführt:",
+    "Benutzer:",
+    "Caption:",
+    "Applikation:"
+]
+TGA_SKIP_KEYWORDS = ("Gruppe", "MW:", "STD:")
+
+
+def iter_tga_lines(source):
+    """
+    Liefert die Zeilen einer ELTRA-Datei einzeln, ohne den gesamten Inhalt aufzuteilen.
+
+    Args:
+        source: Binäres file-like-Objekt (z. B. Streamlit-Upload), bytes oder bereits dekodierter str.
+    """
+    if isinstance(source, str):
+        yield from io.StringIO(source)
+        return
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    reader = io.TextIOWrapper(source, encoding="utf-8", newline=None)
+    try:
+        # Kein `yield from`: das würde beim Abbruch reader.close() und damit den Upload schließen
+        for line in reader:
+            yield line
+    finally:
+        reader.detach()  # Das übergebene Objekt nicht mit schließen
+
 
+def _parse_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
 
-def check_required_tga_headers(file_data: str) -> bool:
+
+def read_tga_file(source):
+    """
+    Liest eine ELTRA-TGA-Ergebnisdatei in einem Durchgang.
+
+    Kopfzeilen (`Schlüssel: Wert`) werden als Metadaten gesammelt, die Spaltenkopfzeile wird
+    erkannt, `Gruppe`/`MW:`/`STD:`-Zeilen werden übersprungen und die Messwerte direkt in
+    typisierte Arrays geschrieben – ohne Zwischen-DataFrames.
+
+    Args:
+        source: Binäres file-like-Objekt, bytes oder str.
+
+    Returns:
+        tuple[dict, pd.DataFrame]: Kopf-Metadaten (Rohtexte) und die sortierten Messwerte
+        (Spalten siehe `TGA_OUTPUT_COLUMNS`; `analysis_date` als Zeitstempel, NaT wenn unbekannt).
+
+    Raises:
+        ValueError: Wenn keine gültige Datenstruktur gefunden wurde.
+    """
+    metadata = {}
+    indices = None
+    expected_num_columns = None
+    sample_ids = []
+    values = {}
+
+    for line in iter_tga_lines(source):
+        if "N ," in line and "Id" in line:
+            columns = [col.strip() for col in line.split(',')]
+            missing = [col for col in TGA_COLUMN_MAP if col not in columns]
+            if missing:
+                raise ValueError(f"Missing TGA columns: {', '.join(missing)}")
+            expected_num_columns = len(columns)
+            indices = {TGA_COLUMN_MAP[col]: columns.index(col) for col in TGA_COLUMN_MAP}
+            for name in indices:
+                values.setdefault(name, array('d'))
+            continue
+
+        if indices is None:
+            # Kopfbereich: "Schlüssel: Wert"-Zeilen sammeln
+            key, sep, value = line.partition(":")
+            if sep and key.strip() and key.strip() not in metadata:
+                metadata[key.strip()] = value.strip()
+            continue
+
+        if any(keyword in line for keyword in TGA_SKIP_KEYWORDS):
+            continue
+
+        fields = line.split(',')
+        if len(fields) != expected_num_columns:
+            continue
+
+        for name, index in indices.items():
+            if name == 'sample_id':
+                sample_ids.append(fields[index].strip())
+            else:
+                values[name].append(_parse_float(fields[index]))
+
+    if indices is None or not sample_ids:
+        raise ValueError("No valid data structure found in the uploaded TGA file.")
+
+    # Nach sample_id sortieren; jede Spalte wird genau einmal in sortierter Reihenfolge kopiert
+    sample_ids = np.array(sample_ids, dtype=object)
+    order = np.argsort(sample_ids, kind="stable")
+    data = {
+        'sample_id': sample_ids[order],
+        'analysis_date': np.datetime64(parse_instrument_date(metadata.get("Analyse durchgeführt")) or "NaT", "ns"),
+    }
+    del sample_ids
+    for name in TGA_OUTPUT_COLUMNS[2:]:
+        data[name] = np.frombuffer(values.pop(name), dtype=np.float64)[order]
+
+    df = pd.DataFrame(data, columns=TGA_OUTPUT_COLUMNS, copy=False)
+    df.index = pd.RangeIndex(len(df))
+    return metadata, df
+
+
+def check_required_tga_headers(file_data) -> bool:
     """
     Checks the content of a single ELTRA TGA file to ensure it contains expected identifiers.
 
     Args:
-        file_data (str): The content of the file as a decoded UTF-8 string.
+        file_data: The file as binary file-like object (read position is restored) or decoded string.
 
     Returns:
         bool: True if the file is valid, False otherwise.
     """
-    expected_identifiers = [
-        "Tga Version:",
-        "Analyse durchgeführt:",
-        "Benutzer:",
-        "Caption:",
-        "Applikation:"
-    ]
-
+    position = file_data.tell() if hasattr(file_data, "tell") else None
+    lines = iter_tga_lines(file_data)
     try:
-        lines = [line.strip() for line in file_data.splitlines()]
-        top_lines = lines[:10]  # Only check the first 10 lines
+        top_lines = [line.strip() for line in islice(lines, 10)]  # Only check the first 10 lines
 
-        missing = [idf for idf in expected_identifiers if not any(line.startswith(idf) for line in top_lines)]
+        missing = [idf for idf in TGA_HEADER_IDENTIFIERS if not any(line.startswith(idf) for line in top_lines)]
 
         if missing:
             return False
@@ -33,92 +165,28 @@ def check_required_tga_headers(file_data: str) -> bool:
 
     except Exception:
         return False
+    finally:
+        lines.close()
+        if position is not None:
+            file_data.seek(position)
 
 
-def tga_process_uploaded_file(file_content: str) -> pd.DataFrame | None:
+def tga_process_uploaded_file(file_content) -> pd.DataFrame | None:
     """
     Processes the content of a single ELTRA TGA result file and returns a cleaned DataFrame,
     including the 'analysis_date' extracted from the header.
 
     Args:
-        file_content (str): The decoded content of the uploaded file.
+        file_content: The uploaded file as binary file-like object, bytes or decoded string.
 
     Returns:
         pd.DataFrame | None: Processed data or None if an error occurred.
     """
     try:
-        lines = file_content.splitlines()
-        data = []
-        columns = None
-        expected_num_columns = None
-        analysis_date_str = None
-
-        # 1. Extrahiere Datum aus Kopfbereich
-        for line in lines[:15]:  # Nur in den ersten Zeilen suchen
-            if line.strip().startswith("Analyse durchgeführt:"):
-                raw_date = line.split("Analyse durchgeführt:")[1].strip()
-                analysis_date_str = raw_date
-                break
-
-        if not analysis_date_str:
+        metadata, df_tga_all = read_tga_file(file_content)
+
+        if not metadata.get("Analyse durchgeführt"):
             st.warning("⚠️ No 'Analyse durchgeführt:' date found.")
-            analysis_date_str = ""
-
-        for line in lines:
-            if "N ," in line and "Id" in line:
-                columns = [col.strip() for col in line.split(',')]
-                expected_num_columns = len(columns)
-                continue
-
-            if any(keyword in line for keyword in ["Gruppe", "MW:", "STD:"]):
-                continue
-
-            values = line.split(',')
-            if columns and len(values) == expected_num_columns:
-                data.append([val.strip() for val in values])
-
-        if not columns or not data:
-            st.error("❌ No valid data structure found in the uploaded TGA file.")
-            return None
-
-        df = pd.DataFrame(data, columns=columns)
-
-        # Typkonvertierung
-        if "N" in df.columns:
-            df["N"] = pd.to_numeric(df["N"], errors="coerce", downcast="integer")
-        if "Id" in df.columns:
-            df["Id"] = df["Id"].astype(str)
-
-        for col in df.columns[2:]:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        # Relevante Spalten auswählen und umbenennen
-        df_tga_all = df[['Id', 'Moisture', 'Va', 'Aa_LTA', 'Aa_HTA', 'Vd', 'Ad_LTA', 'Ad_HTA', 'FCa']].copy()
-        df_tga_all.rename(columns={
-            'Id': 'sample_id',
-            'Va': 'Volatiles_ar',
-            'Vd': 'Volatiles_db',
-            'Aa_LTA': 'Ash_LTA_ar',
-            'Aa_HTA': 'Ash_HTA_ar',
-            'Ad_LTA': 'Ash_LTA_db',
-            'Ad_HTA': 'Ash_HTA_db',
-            'FCa': 'Fixed_C_ar'
-        }, inplace=True)
-
-        # Neue Spalte mit dem Analysedatum einfügen
-        df_tga_all["analysis_date"] = analysis_date_str
-
-        # Spalten in gewünschter Reihenfolge ordnen
-        df_tga_all = df_tga_all[
-            ['sample_id', 'analysis_date', 'Moisture', 'Volatiles_ar', 'Ash_LTA_ar', 'Ash_HTA_ar',
-             'Volatiles_db', 'Ash_LTA_db', 'Ash_HTA_db', 'Fixed_C_ar']
-        ].copy()
-
-        # Spaltennamen in Kleinbuchstaben umwandeln – richtig!
-        df_tga_all.columns = [col.lower() for col in df_tga_all.columns]
-
-        # Nach sample_id sortieren
-        df_tga_all = df_tga_all.sort_values(by='sample_id', ascending=True)
 
         return df_tga_all
 
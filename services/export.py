@@ -1,71 +1,180 @@
+import io
+import tempfile
 import pandas as pd
 from xlsxwriter import Workbook
-import io
 
 
-def tga_export_to_excel(df_tga_mean, df_tga_all):
+# Ab dieser Größe wird die Arbeitsmappe auf die Festplatte statt in den Speicher geschrieben
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+# Zeilen je Schreibblock bzw. Stichprobe für die Spaltenbreite
+EXPORT_CHUNK_SIZE = 10000
+WIDTH_SAMPLE_SIZE = 1000
+MAX_COLUMN_WIDTH = 60
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MIME = "text/csv"
+
+TGA_RENAME = {
+    "Moisture": "Moisture (wt%)",
+    "Va": "Volatiles ar (wt%)",
+    "Aa_LTA": "Ash LTA ar (wt%)",
+    "Ad_HTA": "Ash HTA ar (wt%)",
+    "Vd": "Volatiles dry (wt%)",
+    "FCa": "Fixed Carbon ar (wt%)"
+}
+
+
+def estimate_column_widths(df, sample_size=WIDTH_SAMPLE_SIZE):
     """
-    Speichert zwei DataFrames in einer Excel-Datei mit zwei Sheets und gibt einen Buffer für den Download zurück.
+    Spaltenbreiten aus einer Stichprobe (Anfang + Zufallsauswahl) statt aus allen Zeilen.
 
-    Parameters:
-    - df_chn: DataFrame mit den Mittelwerten der CHN-Daten
-    - df_1: DataFrame mit allen Rohdaten der CHN-Analyse
+    Returns:
+        list[int]: Breite je Spalte (Zeichen), mindestens die Länge der Überschrift.
+    """
+    if len(df) > sample_size:
+        df = pd.concat([df.head(sample_size // 2), df.sample(sample_size // 2, random_state=0)])
+    widths = []
+    for col in df.columns:
+        values = df[col].dropna()
+        longest = values.astype(str).str.len().max() if not values.empty else 0
+        widths.append(min(max(int(longest), len(str(col))) + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+def _chunks(data, chunk_size):
+    # DataFrame in Blöcke teilen; Iterables von DataFrames (z. B. Datenbank-Streams) unverändert
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        yield from data
+
+
+def _cell_values(chunk):
+    # NaN/NaT → leere Zelle; Zeitstempel als datetime, damit xlsxwriter das Datumsformat nutzt
+    values = chunk.astype(object).where(chunk.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def write_excel(sheets, output=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Schreibt mehrere Tabellen als .xlsx im constant_memory-Modus von xlsxwriter.
+
+    Jede Zeile wird direkt nach dem Schreiben auf die Festplatte ausgelagert, der Speicherbedarf
+    hängt daher nicht von der Zeilenzahl ab. Spaltenbreiten werden aus dem ersten Block geschätzt.
+
+    Args:
+        sheets: dict Sheet-Name → DataFrame oder Iterable von DataFrames (gleiche Spalten).
+        output: Ziel-Datei (binär, beschreibbar). Standard: SpooledTemporaryFile.
 
     Returns:
-    - io.BytesIO: Buffer mit Excel-Datei
+        Datei-Objekt mit der Arbeitsmappe, Leseposition am Anfang.
     """
+    if output is None:
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+    workbook = Workbook(output, {
+        "constant_memory": True,
+        "remove_timezone": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    header_format = workbook.add_format({"bold": True})
+    try:
+        for sheet_name, data in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name[:31])
+            row = 0
+            for chunk in _chunks(data, chunk_size):
+                if row == 0:
+                    # Breiten und Überschrift müssen vor den Datenzeilen stehen (constant_memory)
+                    for i, width in enumerate(estimate_column_widths(chunk)):
+                        worksheet.set_column(i, i, width)
+                    worksheet.write_row(0, 0, [str(col) for col in chunk.columns], header_format)
+                    row = 1
+                for values in _cell_values(chunk):
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+    finally:
+        workbook.close()
+
+    output.seek(0)
+    return output
+
+
+def excel_download(sheets):
+    """
+    Callable für `st.download_button(data=...)`: die Datei wird erst beim Klick erzeugt.
+
+    `sheets` darf auch eine Funktion sein, die das dict liefert (z. B. um Daten erst dann zu laden).
+    """
+    def build():
+        with write_excel(sheets() if callable(sheets) else sheets) as output:
+            return output.read()
+    return build
+
+
+def write_csv(frames, output=None):
+    """
+    Schreibt DataFrame-Blöcke (z. B. aus `iter_chn_data`) nacheinander als eine CSV-Datei.
 
-    rename_dict = {
-        "Moisture": "Moisture (wt%)",
-        "Va": "Volatiles ar (wt%)",
-        "Aa_LTA": "Ash LTA ar (wt%)",
-        "Ad_HTA": "Ash HTA ar (wt%)",
-        "Vd": "Volatiles dry (wt%)",
-        "FCa": "Fixed Carbon ar (wt%)"
-    }
+    Es liegt immer nur ein Block im Speicher; die Kopfzeile kommt aus dem ersten Block.
 
-    df_mean_export = df_tga_mean.rename(columns=rename_dict)
-    df_all_export = df_tga_all.rename(columns=rename_dict)
+    Returns:
+        Datei-Objekt (binär, UTF-8) mit der CSV-Datei, Leseposition am Anfang.
+    """
+    if output is None:
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
 
-    buffer = io.BytesIO()
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    header = True
+    for chunk in _chunks(frames, EXPORT_CHUNK_SIZE):
+        chunk.to_csv(text, index=False, header=header)
+        header = False
+    text.flush()
+    text.detach()
 
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        df_mean_export.to_excel(writer, sheet_name='Mean Values', index=False)
-        df_all_export.to_excel(writer, sheet_name='All ELTRA TGA Data', index=False)
+    output.seek(0)
+    return output
 
-        # AutoFit Spaltenbreite (optional, für bessere Darstellung in Excel)
-        for sheet_name, df in {'All ELTRA TGA Data': df_tga_all}.items():
-            worksheet = writer.sheets[sheet_name]
-            for i, col in enumerate(df.columns):
-                max_length = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, max_length)
 
-    buffer.seek(0)  # Zurück zum Anfang des Buffers für den Download
-    return buffer
+def csv_download(frames):
+    """
+    Callable für `st.download_button(data=...)`: die CSV-Datei wird erst beim Klick erzeugt.
 
-def chn_export_to_excel(df_chn_mean, df_chn_all):
+    `frames` sollte eine Funktion sein, die die DataFrame-Blöcke liefert – ein Generator
+    ließe sich nur einmal herunterladen.
     """
-    Speichert zwei DataFrames in einer Excel-Datei mit zwei Sheets und gibt einen Buffer für den Download zurück.
+    def build():
+        with write_csv(frames() if callable(frames) else frames) as output:
+            return output.read()
+    return build
+
+
+def tga_export_to_excel(df_tga_mean, df_tga_all):
+    """
+    Speichert zwei DataFrames in einer Excel-Datei mit zwei Sheets.
 
     Parameters:
-    - df_chn: DataFrame mit den Mittelwerten der CHN-Daten
-    - df_1: DataFrame mit allen Rohdaten der CHN-Analyse
+    - df_tga_mean: DataFrame mit den Mittelwerten der ELTRA-TGA-Daten
+    - df_tga_all: DataFrame (oder Iterable von DataFrames) mit allen Rohdaten
 
     Returns:
-    - io.BytesIO: Buffer mit Excel-Datei
+    - Datei-Objekt mit der Excel-Datei (Leseposition am Anfang)
     """
-    buffer = io.BytesIO()
+    rename = lambda df: df.rename(columns=TGA_RENAME)
+    all_data = rename(df_tga_all) if isinstance(df_tga_all, pd.DataFrame) else map(rename, df_tga_all)
+    return write_excel({"Mean Values": rename(df_tga_mean), "All ELTRA TGA Data": all_data})
+
 
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        df_chn_mean.to_excel(writer, sheet_name='Mean Values', index=False)
-        df_chn_all.to_excel(writer, sheet_name='All CHN Data', index=False)
+def chn_export_to_excel(df_chn_mean, df_chn_all):
+    """
+    Speichert zwei DataFrames in einer Excel-Datei mit zwei Sheets.
 
-        # AutoFit Spaltenbreite (optional, für bessere Darstellung in Excel)
-        for sheet_name, df in {'All CHN Data': df_chn_all}.items():
-            worksheet = writer.sheets[sheet_name]
-            for i, col in enumerate(df.columns):
-                max_length = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, max_length)
+    Parameters:
+    - df_chn_mean: DataFrame mit den Mittelwerten der CHN-Daten
+    - df_chn_all: DataFrame (oder Iterable von DataFrames) mit allen Rohdaten der CHN-Analyse
 
-    buffer.seek(0)  # Zurück zum Anfang des Buffers für den Download
-    return buffer
\ No newline at end of file
+    Returns:
+    - Datei-Objekt mit der Excel-Datei (Leseposition am Anfang)
+    """
+    return write_excel({"Mean Values": df_chn_mean, "All CHN Data": df_chn_all})
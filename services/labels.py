@@ -0,0 +1,63 @@
+import zipfile
+import tempfile
+
+
+# Felder eines Sample-Labels (Beschriftung, Spalte in `samples`)
+LABEL_FIELDS = [
+    ("Sample ID", "sample_id"),
+    ("Type", "sample_type"),
+    ("Project", "project"),
+    ("Sampling Date", "sampling_date"),
+    ("Location", "sampling_location"),
+    ("Condition", "sample_condition"),
+    ("Responsible", "responsible_person"),
+]
+
+# Ab dieser Größe wird das Archiv auf die Festplatte statt in den Speicher geschrieben
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def format_sample_label(sample):
+    """
+    Markdown-Label eines Samples.
+
+    Args:
+        sample: Mapping mit den Spalten aus `samples` (z. B. Zeile aus `iter_samples` oder pd.Series).
+    """
+    lines = []
+    for label, column in LABEL_FIELDS:
+        value = sample.get(column) if hasattr(sample, "get") else None
+        lines.append(f"**{label}**: `{'N/A' if value is None else value}`  ")
+    return "\n".join(lines) + "\n"
+
+
+def label_file_name(sample):
+    return f"{sample['sample_id']}_label.txt"
+
+
+def write_label_archive(samples, combined=False):
+    """
+    Schreibt die Labels aller `samples` als ZIP (ein .txt pro Sample) oder als eine
+    zusammengefasste, druckbare Textdatei.
+
+    `samples` wird nur einmal durchlaufen (z. B. der Generator `iter_samples`); die Ausgabe
+    landet in einer SpooledTemporaryFile, sodass große Exporte nicht im Speicher gehalten werden.
+
+    Returns:
+        tuple[SpooledTemporaryFile, int]: Datei (Leseposition am Anfang) und Anzahl der Labels.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    count = 0
+    if combined:
+        for sample in samples:
+            if count:
+                output.write(b"\n---\n\n")
+            output.write(format_sample_label(sample).encode("utf-8"))
+            count += 1
+    else:
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for sample in samples:
+                archive.writestr(label_file_name(sample), format_sample_label(sample))
+                count += 1
+    output.seek(0)
+    return output, count
@@ -1,27 +1,149 @@
+import os
+import queue
+import atexit
 import logging
-import streamlit as st
+import threading
+from collections import OrderedDict, deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 
-class StreamlitLoggerHandler(logging.Handler):
-    """Custom Logging Handler zur Integration in Streamlit."""
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Warteschlange zwischen Skript-Threads und dem Listener-Thread; ist sie voll, wird verworfen
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Ringpuffer je Streamlit-Session (Anzahl Einträge) und Anzahl gepufferter Sessions
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "200"))
+LOG_MAX_SESSIONS = int(os.getenv("LOG_MAX_SESSIONS", "100"))
+
+# Optionale Log-Datei mit Rotation
+LOG_FILE = os.getenv("LOG_FILE")
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv("LOG_FILE_BACKUPS", "5"))
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Legt Log-Records ohne Formatierung in eine begrenzte Queue.
+
+    Formatiert wird erst im Listener-Thread bzw. beim Anzeigen; im Skript-Thread wird nur die
+    Session-ID vermerkt. Ist die Queue voll, wird der Record verworfen statt zu blockieren.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        ctx = get_script_run_ctx(suppress_warning=True)
+        record.session_id = ctx.session_id if ctx is not None else None
+        if record.exc_info:
+            # Traceback jetzt als Text sichern – der Record soll keine Frames am Leben halten
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SessionBufferHandler(logging.Handler):
+    """Hält die letzten `LOG_BUFFER_SIZE` Records je Session (LRU über `LOG_MAX_SESSIONS` Sessions)."""
+
+    def __init__(self, buffer_size=LOG_BUFFER_SIZE, max_sessions=LOG_MAX_SESSIONS):
+        super().__init__()
+        self.buffer_size = buffer_size
+        self.max_sessions = max_sessions
+        self._buffers = OrderedDict()
+        self._buffer_lock = threading.Lock()
 
     def emit(self, record):
-        log_entry = self.format(record)
-        if "logs" not in st.session_state:
-            st.session_state["logs"] = []  # Initialisiere Logs, falls nicht vorhanden
-        st.session_state["logs"].append(log_entry)
+        session_id = getattr(record, "session_id", None)
+        if session_id is None:
+            return
+        with self._buffer_lock:
+            buffer = self._buffers.get(session_id)
+            if buffer is None:
+                buffer = self._buffers[session_id] = deque(maxlen=self.buffer_size)
+                while len(self._buffers) > self.max_sessions:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(session_id)
+            buffer.append(record)
+
+    def records(self, session_id):
+        with self._buffer_lock:
+            return list(self._buffers.get(session_id, ()))
+
+
+_session_buffer = SessionBufferHandler()
+_queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+
+
+def setup_logging():
+    """
+    Richtet das prozessweite Logging einmalig ein: Root-Logger → Queue → Listener-Thread mit
+    Konsole, Session-Ringpuffer und (falls `LOG_FILE` gesetzt) rotierender Log-Datei.
+    """
+    global _listener
+    with _setup_lock:
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        # Auch nach einem Neuladen des Moduls nur einen Queue-Handler behalten
+        for handler in [h for h in root.handlers if h.get_name() == "app_queue"]:
+            root.removeHandler(handler)
+        if _listener is not None:
+            root.addHandler(_queue_handler)
+            return
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        console = logging.StreamHandler()
+        console.setFormatter(formatter)
+        handlers = [console, _session_buffer]
+        if LOG_FILE:
+            file_handler = RotatingFileHandler(
+                LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+            )
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
 
+        _queue_handler.set_name("app_queue")
+        root.addHandler(_queue_handler)
+        _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
 
-# Logging initialisieren
-def setup_logger():
-    """Initialisiert das globale Logging."""
-    logger = logging.getLogger("streamlit_logger")
-    logger.setLevel(logging.INFO)  # Setze das Standard-Log-Level (z. B. INFO)
 
-    # Streamlit-Handler (zum Anzeigen der Logs in der App)
-    streamlit_handler = StreamlitLoggerHandler()
-    streamlit_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-    logger.addHandler(streamlit_handler)
+def get_session_logs(session_id=None, limit=None):
+    """
+    Formatierte Log-Zeilen einer Session (Standard: aktuelle Session), älteste zuerst.
+    Formatiert wird erst hier – also nur, wenn die Logs tatsächlich angezeigt werden.
+    """
+    if session_id is None:
+        ctx = get_script_run_ctx(suppress_warning=True)
+        session_id = ctx.session_id if ctx is not None else None
+    records = _session_buffer.records(session_id)
+    if limit:
+        records = records[-limit:]
+    formatter = logging.Formatter(LOG_FORMAT)
+    return [formatter.format(record) for record in records]
 
-    return logger  # Gibt den Logger zurück
 
+def get_logging_stats():
+    """Füllstand der Queue und verworfene Records (für das Monitoring)."""
+    return {
+        "queue_size": _queue_handler.queue.qsize(),
+        "queue_capacity": LOG_QUEUE_SIZE,
+        "dropped": _queue_handler.dropped,
+        "buffered_sessions": len(_session_buffer._buffers),
+        "buffer_size": LOG_BUFFER_SIZE,
+        "log_file": LOG_FILE,
+    }
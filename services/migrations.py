@@ -0,0 +1,345 @@
+import sys
+import logging
+import datetime
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, Integer, String, Date, DateTime, select, func, text, inspect, bindparam
+from sqlalchemy.orm import Session
+from services.database import (
+    engine, Base, Sample, CHNData, EltraTGAData, SampleSummary, _backfill_sample_id_sequences,
+    _rebuild_sample_summary, rebuild_sample_summary, check_sample_summary
+)
+from services.dates import parse_instrument_dates
+
+
+# -------------------------------
+# 📜 Versionsverwaltung
+# -------------------------------
+# Eigene Metadaten, damit `Base.metadata.create_all` die Versionstabelle nicht mit anlegt
+_migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+# Schlüssel für pg_advisory_xact_lock – verhindert parallele Upgrades mehrerer Prozesse
+_ADVISORY_LOCK_ID = 4711
+
+
+def migration(version, name):
+    """Registriert eine Migration. Die Funktion erhält eine Connection in offener Transaktion."""
+    def decorator(func):
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return decorator
+
+
+def current_version(connection):
+    """Höchste angewendete Version (0, wenn die Versionstabelle noch fehlt)."""
+    if not inspect(connection).has_table(schema_migrations.name):
+        return 0
+    return connection.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def upgrade_database(target=None):
+    """
+    Wendet alle ausstehenden Migrationen an – jede in einer eigenen Transaktion.
+
+    Args:
+        target: Engine der Zieldatenbank (Standard: Engine der App).
+
+    Returns:
+        bool: True, wenn die Datenbank dabei neu angelegt wurde.
+    """
+    target = target or engine
+    with target.connect() as connection:
+        if current_version(connection) >= latest_version():
+            return False  # Schema aktuell – nur eine Abfrage
+        fresh = not inspect(connection).has_table("users")
+
+    for version, name, func_ in MIGRATIONS:
+        with target.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+            _migration_metadata.create_all(connection)
+            if version <= current_version(connection):
+                continue
+
+            logging.info(f"🔧 Migration {version}: {name}")
+            func_(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.datetime.now(datetime.timezone.utc)
+            ))
+
+    if fresh:
+        logging.info("🆕 Datenbank wurde initialisiert.")
+    return fresh
+
+
+# -------------------------------
+# 🧱 Migrationen
+# -------------------------------
+@migration(1, "baseline schema")
+def _baseline(connection):
+    # Legt nur fehlende Tabellen an – bestehende Installationen bleiben unverändert
+    Base.metadata.create_all(connection)
+
+
+@migration(2, "backfill sample id sequences")
+def _backfill_sequences(connection):
+    with Session(bind=connection) as session:
+        _backfill_sample_id_sequences(session)
+
+
+# Sekundärindizes für Joins und Filter der Lese-Funktionen. chn_data/eltra_tga_data.sample_id
+# sind bereits über die Unique-Constraints (sample_id als führende Spalte) indiziert.
+BTREE_INDEXES = [
+    ("ix_samples_project", "samples", "project"),
+    ("ix_chn_data_analysis_date", "chn_data", "analysis_date"),
+    ("ix_eltra_tga_data_analysis_date", "eltra_tga_data", "analysis_date"),
+]
+
+# Trigram-Indizes für die `ilike '%…%'`-Filter (nur PostgreSQL, Erweiterung pg_trgm)
+TRIGRAM_INDEXES = [
+    ("ix_samples_sample_id_trgm", "samples", "sample_id"),
+    ("ix_samples_project_trgm", "samples", "project"),
+    ("ix_chn_data_sample_id_trgm", "chn_data", "sample_id"),
+    ("ix_eltra_tga_data_sample_id_trgm", "eltra_tga_data", "sample_id"),
+]
+
+
+@migration(3, "secondary and trigram indexes")
+def _secondary_indexes(connection):
+    for index_name, table, column in BTREE_INDEXES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column})"))
+
+    if connection.dialect.name != "postgresql":
+        return
+
+    # CREATE EXTENSION erfordert Rechte – ohne pg_trgm bleiben die ilike-Filter unindiziert
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        logging.warning(f"⚠️ pg_trgm nicht verfügbar, Trigram-Indizes werden übersprungen: {e}")
+        return
+
+    for index_name, table, column in TRIGRAM_INDEXES:
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING gin ({column} gin_trgm_ops)"
+        ))
+
+
+# Bisher als Text gespeicherte Datumsspalten: (Tabelle, Spalte, Zieltyp)
+DATE_COLUMNS = [
+    ("samples", "registration_date", "date"),
+    ("samples", "sampling_date", "date"),
+    ("chn_data", "analysis_date", "timestamp"),
+    ("eltra_tga_data", "analysis_date", "timestamp"),
+    ("ingested_files", "analysis_date", "timestamp"),
+]
+
+
+def _convert_date_column(connection, table, column, target):
+    """
+    Schreibt die Textwerte einer Spalte als ISO-Datum/-Zeitstempel zurück.
+
+    Geparst wird nur jeder unterschiedliche Wert einmal (vektorisiert); die Updates laufen
+    gesammelt per executemany. Nicht erkennbare Werte werden auf NULL gesetzt und geloggt.
+    """
+    raw_values = connection.execute(text(
+        f"SELECT DISTINCT CAST({column} AS VARCHAR) FROM {table} WHERE {column} IS NOT NULL"
+    )).scalars().all()
+    if not raw_values:
+        return
+
+    parsed = parse_instrument_dates(raw_values)
+    value_type = Date() if target == "date" else DateTime()
+    updates = []
+    unparsed = []
+    for raw, value in zip(raw_values, parsed):
+        if pd.isna(value):
+            unparsed.append(raw)
+            updates.append({"old": raw, "new": None})
+        else:
+            new = value.date() if target == "date" else value.to_pydatetime()
+            updates.append({"old": raw, "new": new})
+
+    if unparsed:
+        logging.warning(f"⚠️ {table}.{column}: {len(unparsed)} nicht erkennbare Werte → NULL, z. B. {unparsed[:5]}")
+
+    if connection.dialect.name == "postgresql":
+        # Erst ISO-Text schreiben, dann den Spaltentyp umstellen
+        stmt = text(f"UPDATE {table} SET {column} = :new WHERE {column} = :old")
+        connection.execute(stmt, [
+            {"old": update["old"], "new": None if update["new"] is None else update["new"].isoformat()}
+            for update in updates
+        ])
+        connection.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {target.upper()} USING {column}::{target}"
+        ))
+    else:
+        # SQLite: Werte im Speicherformat von SQLAlchemys Date/DateTime ablegen
+        stmt = text(f"UPDATE {table} SET {column} = :new WHERE {column} = :old").bindparams(
+            bindparam("new", type_=value_type), bindparam("old", type_=String())
+        )
+        connection.execute(stmt, updates)
+
+
+@migration(4, "typed date columns")
+def _typed_date_columns(connection):
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    for table, column, target in DATE_COLUMNS:
+        if table not in existing:
+            continue
+        column_types = {col["name"]: col["type"] for col in inspector.get_columns(table)}
+        # Nur noch als Text angelegte Spalten umwandeln (neue Datenbanken sind bereits typisiert)
+        if isinstance(column_types.get(column), String):
+            _convert_date_column(connection, table, column, target)
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_samples_registration_date ON samples (registration_date)"
+    ))
+
+
+@migration(5, "sample summary table")
+def _sample_summary(connection):
+    # Tabelle anlegen (bestehende Installationen) und einmal aus den Messwerten befüllen
+    SampleSummary.__table__.create(connection, checkfirst=True)
+    with Session(bind=connection) as session:
+        _rebuild_sample_summary(session)
+
+
+# -------------------------------
+# 🔍 Prüfung der Abfragepläne
+# -------------------------------
+def hot_queries(dialect_name):
+    """
+    Die häufigsten Filter der Lese-Funktionen und der jeweils erwartete Index.
+
+    Returns:
+        list[tuple[str, Select, str | None]]: Name, Abfrage und erwarteter Indexname
+        (None = beliebiger Index, z. B. der automatisch benannte Unique-Index unter SQLite).
+    """
+    queries = [
+        ("samples by project",
+         select(Sample.sample_id).where(Sample.project == "x"), "ix_samples_project"),
+        ("chn_data by sample_id",
+         select(CHNData.id).where(CHNData.sample_id == "x"), None),
+        ("eltra_tga_data by sample_id",
+         select(EltraTGAData.id).where(EltraTGAData.sample_id == "x"), None),
+        ("samples by registration_date range",
+         select(Sample.sample_id).where(Sample.registration_date.between(datetime.date(2024, 1, 1),
+                                                                         datetime.date(2024, 12, 31))),
+         "ix_samples_registration_date"),
+        ("chn_data by analysis_date range",
+         select(CHNData.id).where(CHNData.analysis_date >= datetime.datetime(2024, 1, 1),
+                                  CHNData.analysis_date < datetime.datetime(2025, 1, 1)),
+         "ix_chn_data_analysis_date"),
+        ("eltra_tga_data by analysis_date range",
+         select(EltraTGAData.id).where(EltraTGAData.analysis_date >= datetime.datetime(2024, 1, 1),
+                                       EltraTGAData.analysis_date < datetime.datetime(2025, 1, 1)),
+         "ix_eltra_tga_data_analysis_date"),
+    ]
+    if dialect_name == "postgresql":
+        queries += [
+            ("samples by project ilike",
+             select(Sample.sample_id).where(Sample.project.ilike("%abc%")), "ix_samples_project_trgm"),
+            ("chn_data by sample_id ilike",
+             select(CHNData.id).where(CHNData.sample_id.ilike("%abc%")), "ix_chn_data_sample_id_trgm"),
+        ]
+    return queries
+
+
+def explain(connection, stmt):
+    """Abfrageplan als Text (SQLite: EXPLAIN QUERY PLAN, PostgreSQL: EXPLAIN)."""
+    sql = str(stmt.compile(connection, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(row[0] for row in connection.execute(text(f"EXPLAIN {sql}")).all())
+
+
+def _uses_index(plan, dialect_name, index_name):
+    if dialect_name == "sqlite":
+        markers = [f"INDEX {index_name}"] if index_name else ["USING INDEX", "USING COVERING INDEX"]
+    else:
+        markers = [f"on {index_name}"] if index_name else ["Index Scan", "Index Only Scan", "Bitmap Index Scan"]
+    return any(marker in plan for marker in markers)
+
+
+def check_query_plans():
+    """
+    Prüft per EXPLAIN, ob die Hot Queries ihre Indizes verwenden.
+
+    Auf PostgreSQL werden Sequential Scans für die Prüfung deaktiviert, damit das Ergebnis
+    nicht von der aktuellen Tabellengröße abhängt (kleine Tabellen scannt der Planer sequenziell).
+
+    Returns:
+        list[dict]: `query`, `expected_index`, `uses_index` und `plan` je Abfrage.
+    """
+    results = []
+    with engine.begin() as connection:
+        dialect_name = connection.dialect.name
+        if dialect_name == "postgresql":
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for name, stmt, index_name in hot_queries(dialect_name):
+            plan = explain(connection, stmt)
+            results.append({
+                "query": name,
+                "expected_index": index_name or "any",
+                "uses_index": _uses_index(plan, dialect_name, index_name),
+                "plan": plan,
+            })
+    return results
+
+
+def main(argv=None):
+    """CLI: `python -m services.migrations [upgrade|status|check|summary-rebuild|summary-check]`."""
+    command = (argv or sys.argv[1:] or ["upgrade"])[0]
+
+    if command == "upgrade":
+        upgrade_database()
+        print(f"✅ Schema-Version {latest_version()}")
+    elif command == "status":
+        with engine.connect() as connection:
+            print(f"Aktuelle Version: {current_version(connection)} / verfügbar: {latest_version()}")
+    elif command == "check":
+        upgrade_database()
+        failed = False
+        for result in check_query_plans():
+            status = "✅" if result["uses_index"] else "❌"
+            failed |= not result["uses_index"]
+            print(f"{status} {result['query']} (Index: {result['expected_index']})\n    {result['plan']}")
+        return 1 if failed else 0
+    elif command == "summary-rebuild":
+        upgrade_database()
+        count = rebuild_sample_summary()
+        if count is None:
+            return 1
+        print(f"✅ sample_summary neu aufgebaut ({count} Samples)")
+    elif command == "summary-check":
+        upgrade_database()
+        mismatches = check_sample_summary()
+        if not mismatches.empty:
+            print(mismatches.to_string(index=False))
+            print(f"❌ {mismatches['sample_id'].nunique()} Samples weichen ab – `summary-rebuild` ausführen")
+            return 1
+        print("✅ sample_summary ist konsistent")
+    else:
+        print(f"Unbekannter Befehl: {command}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import os
+import hashlib
+from services.cache import TTLCache
+from services import eltra_tga_processing, chn_processing
+
+
+PARSER_VERSIONS = {
+    "tga": eltra_tga_processing.PARSER_VERSION,
+    "chn": chn_processing.PARSER_VERSION,
+}
+
+# Geparste Dateien, adressiert über Inhalt und Parser-Version (kein Ablauf, nur LRU)
+_parse_cache = TTLCache(max_entries=int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "64")), ttl=None)
+
+# Upload-ID → Inhalts-Hash, damit derselbe Upload bei einem Rerun nicht erneut gehasht wird
+_hash_by_upload = TTLCache(max_entries=1024, ttl=None)
+
+
+def content_hash(data):
+    """SHA-256 des Dateiinhalts (hex)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def upload_hash(uploaded_file):
+    """Inhalts-Hash eines Streamlit-Uploads; pro Upload (file_id) wird nur einmal gehasht."""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None:
+        cached = _hash_by_upload.get(file_id)
+        if cached is not None:
+            return cached
+
+    digest = content_hash(uploaded_file.getvalue())
+    if file_id is not None:
+        _hash_by_upload.set(file_id, digest)
+    return digest
+
+
+def _key(instrument, digest):
+    return instrument, PARSER_VERSIONS[instrument], digest
+
+
+def get_parsed(instrument, digest):
+    """Gecachtes Parse-Ergebnis (siehe `batch_upload.parse_instrument_file`) oder None."""
+    return _parse_cache.get(_key(instrument, digest))
+
+
+def store_parsed(instrument, digest, result):
+    _parse_cache.set(_key(instrument, digest), result)
+
+
+def get_parse_cache_stats():
+    return _parse_cache.stats()
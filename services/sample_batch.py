@@ -0,0 +1,115 @@
+import io
+import re
+import pandas as pd
+
+
+# Spalten einer Sammel-Registrierung (entsprechen den Feldern des Registrierungsdialogs)
+BATCH_COLUMNS = [
+    "prefix", "sample_type", "project", "sampling_date",
+    "sampling_location", "sample_condition", "responsible_person"
+]
+REQUIRED_COLUMNS = ["sample_type", "responsible_person"]
+
+# Alternative Spaltenüberschriften (Dialog-Beschriftungen, Kurzformen)
+COLUMN_ALIASES = {
+    "sample_id_prefix": "prefix",
+    "type": "sample_type",
+    "location": "sampling_location",
+    "condition": "sample_condition",
+    "responsible": "responsible_person",
+}
+
+# Mindestlänge wie im Einzel-Dialog
+MIN_TEXT_LENGTH = 3
+
+# Präfix der Sample-ID (Einzel-Dialog und Sammel-Registrierung): nicht leer, ohne Leerzeichen
+PREFIX_PATTERN = r"\S+"
+PREFIX_MESSAGE = "Sample ID Prefix must not be empty or contain whitespace."
+
+
+def is_valid_prefix(prefix):
+    """Prüft einen (bereits getrimmten) Präfix nach `PREFIX_PATTERN`."""
+    return isinstance(prefix, str) and re.fullmatch(PREFIX_PATTERN, prefix) is not None
+
+
+def _normalize_header(name):
+    key = str(name).strip().lower().replace(" ", "_").replace("-", "_")
+    return COLUMN_ALIASES.get(key, key)
+
+
+def read_sample_sheet(uploaded_file):
+    """
+    Liest eine CSV- oder Excel-Datei mit Sample-Metadaten (alle Zellen als Text).
+
+    Returns:
+        pd.DataFrame: Spalten laut `BATCH_COLUMNS` (fehlende optionale Spalten leer) plus
+        `row` – die Zeilennummer in der Datei (Kopfzeile = 1) für Fehlermeldungen und Zuordnung.
+
+    Raises:
+        ValueError: Bei unbekanntem Dateiformat oder fehlenden Pflicht-Spalten.
+    """
+    name = getattr(uploaded_file, "name", "").lower()
+    if name.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(uploaded_file, dtype=str)
+    elif name.endswith((".csv", ".txt")):
+        df = pd.read_csv(uploaded_file, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    else:
+        raise ValueError("Unsupported file type – please upload a CSV or Excel file.")
+
+    df.columns = [_normalize_header(col) for col in df.columns]
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    df = df.dropna(how="all")
+    df = df.reindex(columns=BATCH_COLUMNS)
+    df.insert(0, "row", df.index + 2)
+    return df.reset_index(drop=True)
+
+
+def validate_sample_sheet(df, default_prefix="ABC"):
+    """
+    Prüft alle Zeilen vektorisiert nach den Regeln des Registrierungsdialogs.
+
+    Args:
+        df (pd.DataFrame): Ergebnis von `read_sample_sheet`.
+        default_prefix (str): Präfix für Zeilen ohne eigenen Präfix (leer: diese Zeilen sind ungültig).
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Bereinigte Zeilen (Texte getrimmt, `sampling_date`
+        als Datum) und die Fehlerliste mit den Spalten `row`, `column` und `message`.
+    """
+    clean = df.copy()
+    text_columns = [col for col in BATCH_COLUMNS if col != "sampling_date"]
+    for col in text_columns:
+        clean[col] = clean[col].astype("string").str.strip().replace("", pd.NA)
+    clean["prefix"] = clean["prefix"].fillna((default_prefix or "").strip() or pd.NA)
+
+    raw_dates = clean["sampling_date"].astype("string").str.strip().replace("", pd.NA)
+    sampling_dates = pd.to_datetime(raw_dates, errors="coerce", format="mixed", dayfirst=True)
+    clean["sampling_date"] = sampling_dates.dt.date.astype(object).where(sampling_dates.notna(), None)
+
+    checks = [
+        ("sample_type", clean["sample_type"].str.len().fillna(0) < MIN_TEXT_LENGTH,
+         f"Sample Type must contain at least {MIN_TEXT_LENGTH} characters."),
+        ("responsible_person", clean["responsible_person"].str.len().fillna(0) < MIN_TEXT_LENGTH,
+         f"Responsible Person must contain at least {MIN_TEXT_LENGTH} characters."),
+        ("prefix", ~clean["prefix"].str.fullmatch(PREFIX_PATTERN).fillna(False).astype(bool),
+         PREFIX_MESSAGE),
+        ("sampling_date", raw_dates.notna() & sampling_dates.isna(),
+         "Sampling Date is not a valid date."),
+    ]
+    errors = pd.concat(
+        [pd.DataFrame({"row": clean.loc[failed, "row"], "column": column, "message": message})
+         for column, failed, message in checks],
+        ignore_index=True
+    ).sort_values(["row", "column"], ignore_index=True)
+    return clean, errors
+
+
+def mapping_sheet(df):
+    """Excel-Datei (bytes) mit der Zuordnung Eingabezeile → vergebene Sample-ID."""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Sample IDs")
+    return output.getvalue()
@@ -0,0 +1,131 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+
+# -------------------------------
+# 🔑 Passwort-Hashing
+# -------------------------------
+# Kostenfaktor für neue Hashes; bestehende Hashes werden beim nächsten Login angepasst
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# bcrypt gibt während des Hashens den GIL frei – der Pool begrenzt, wie viele Kerne
+# gleichzeitige Logins belegen können, statt alle Skript-Threads zu blockieren
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "30"))
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+# Vergleichs-Hash für unbekannte Benutzer – gleiche Antwortzeit wie bei falschem Passwort
+_dummy_hash = None
+
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+        return _hash_pool
+
+
+def _run_in_pool(func, *args):
+    return _get_hash_pool().submit(func, *args).result(timeout=HASH_TIMEOUT)
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+
+
+def hash_password(password, rounds=None):
+    """bcrypt-Hash (str) mit `BCRYPT_ROUNDS` – berechnet im Hash-Pool."""
+    return _run_in_pool(_hashpw, password, rounds or BCRYPT_ROUNDS)
+
+
+def verify_password(password, hashed):
+    """
+    Prüft ein Passwort im Hash-Pool. Mit `hashed=None` (unbekannter Benutzer) wird gegen einen
+    Dummy-Hash geprüft, damit die Antwortzeit nichts über existierende Benutzer verrät.
+    """
+    global _dummy_hash
+    if hashed is None:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password("dummy-password")
+        _run_in_pool(bcrypt.checkpw, password.encode(), _dummy_hash.encode())
+        return False
+    return _run_in_pool(bcrypt.checkpw, password.encode(), hashed.encode())
+
+
+def hash_rounds(hashed):
+    """Kostenfaktor eines bcrypt-Hashes ($2b$12$…) oder None."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+# -------------------------------
+# 🚦 Login-Drosselung
+# -------------------------------
+# Fehlversuche je Benutzer bzw. Client-IP innerhalb des Zeitfensters, danach Sperre bis
+# der älteste Fehlversuch aus dem Fenster fällt
+LOGIN_WINDOW = float(os.getenv("LOGIN_WINDOW", "300"))
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "5"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+_MAX_TRACKED_KEYS = 10000
+
+_login_failures = {}
+_login_lock = threading.Lock()
+
+
+def _throttle_keys(username, client_ip):
+    keys = [(("user", (username or "").strip().lower()), LOGIN_MAX_FAILURES_PER_USER)]
+    if client_ip:
+        keys.append((("ip", client_ip), LOGIN_MAX_FAILURES_PER_IP))
+    return keys
+
+
+def _prune(failures, now):
+    while failures and failures[0] <= now - LOGIN_WINDOW:
+        failures.popleft()
+
+
+def login_retry_after(username, client_ip=None):
+    """Sekunden bis zum nächsten erlaubten Login-Versuch (0 = erlaubt)."""
+    now = time.monotonic()
+    retry_after = 0.0
+    with _login_lock:
+        for key, limit in _throttle_keys(username, client_ip):
+            failures = _login_failures.get(key)
+            if not failures:
+                continue
+            _prune(failures, now)
+            if len(failures) >= limit:
+                retry_after = max(retry_after, failures[0] + LOGIN_WINDOW - now)
+    return retry_after
+
+
+def record_login_failure(username, client_ip=None):
+    now = time.monotonic()
+    with _login_lock:
+        if len(_login_failures) > _MAX_TRACKED_KEYS:
+            for key in [key for key, failures in _login_failures.items()
+                        if not failures or failures[-1] <= now - LOGIN_WINDOW]:
+                del _login_failures[key]
+        for key, limit in _throttle_keys(username, client_ip):
+            failures = _login_failures.setdefault(key, deque(maxlen=limit))
+            _prune(failures, now)
+            failures.append(now)
+
+
+def reset_login_failures(username):
+    """Nach erfolgreichem Login: Fehlversuche des Benutzers verwerfen (IP-Zähler bleibt)."""
+    with _login_lock:
+        _login_failures.pop(_throttle_keys(username, None)[0][0], None)
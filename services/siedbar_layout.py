@@ -1,9 +1,8 @@
 import logging
 import streamlit as st
-from services.database import authenticate_user
-
-# Logging konfigurieren
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+from services.database import authenticate_user, fetch_ingested_files
+from services.parse_cache import upload_hash
+from services.security import login_retry_after
 
 # Login-Funktion
 def login():
@@ -41,7 +40,14 @@ def login():
         logging.info(f"🔐 Login attempt for user: {username}")
         st.info(f"🔍 Login attempt for user: `{username}`")
 
-        login_successful, role = authenticate_user(username, password)
+        client_ip = getattr(st.context, "ip_address", None)
+        retry_after = login_retry_after(username, client_ip)
+        if retry_after:
+            logging.warning(f"🚦 Login throttled for user: {username}")
+            st.error(f"🚦 Too many failed attempts. Please try again in {int(retry_after) + 1} seconds.")
+            return
+
+        login_successful, role = authenticate_user(username, password, client_ip=client_ip)
         if login_successful:
             logging.info(f"✅ Login successful for user: {username} (role: {role})")
             st.session_state["logged_in"] = True
@@ -65,3 +71,72 @@ def logout():
     st.session_state["role"] = None
     st.session_state["username"] = None
 
+
+# Seitennavigation für tabellarische Daten
+def paged_query(fetch_page, key, page_sizes=(50, 100, 250, 500), **filters):
+    """
+    Lädt genau eine Seite über `fetch_page` und zeigt die Seitennavigation in der Sidebar an.
+
+    Args:
+        fetch_page (callable): Eine der `fetch_*_page`-Funktionen aus services.database.
+        key (str): Eindeutiger Präfix für die Widget-Keys der Seite.
+        **filters: Filter, die unverändert an `fetch_page` weitergereicht werden.
+
+    Returns:
+        tuple[pd.DataFrame, int]: Zeilen der aktuellen Seite und Gesamtanzahl der Treffer.
+    """
+    page_key = f"{key}_page"
+    page_size = st.sidebar.selectbox("Rows per page", page_sizes, key=f"{key}_page_size")
+    page = st.session_state.get(page_key, 1)
+
+    df, total_count = fetch_page(page=page, page_size=page_size, **filters)
+    page_count = max((total_count + page_size - 1) // page_size, 1)
+
+    # Nach einer Filteränderung kann die gewählte Seite außerhalb des Bereichs liegen
+    if page > page_count:
+        page = 1
+        st.session_state[page_key] = page
+        df, total_count = fetch_page(page=page, page_size=page_size, **filters)
+
+    st.sidebar.number_input("Page", min_value=1, max_value=page_count, step=1, key=page_key)
+    st.sidebar.caption(f"{total_count} rows · page {page} of {page_count}")
+    return df, total_count
+
+
+# Datumsbereich-Filter in der Sidebar
+def date_range_filter(label, key):
+    """
+    Zeigt einen optionalen Datumsbereich in der Sidebar an.
+
+    Returns:
+        tuple[datetime.date | None, datetime.date | None]: `date_from` und `date_to` (inklusive)
+        für die `fetch_*`-Funktionen; None, solange keine Grenze gewählt ist.
+    """
+    selected = st.sidebar.date_input(label, value=(), key=key)
+    if not selected:
+        return None, None
+    date_from = selected[0]
+    date_to = selected[1] if len(selected) > 1 else None
+    return date_from, date_to
+
+
+# Bereits importierte Uploads herausfiltern
+def skip_ingested_files(uploaded_files):
+    """
+    Gleicht die Uploads per Inhalts-Hash mit dem Manifest `ingested_files` ab (eine Abfrage),
+    meldet bereits importierte Dateien und gibt nur die neuen zurück.
+    """
+    hashes = [upload_hash(uploaded_file) for uploaded_file in uploaded_files]
+    ingested = fetch_ingested_files(tuple(hashes)).set_index("content_hash")
+
+    new_files = []
+    for uploaded_file, digest in zip(uploaded_files, hashes):
+        if digest in ingested.index:
+            entry = ingested.loc[digest]
+            st.info(
+                f"ℹ️ `{uploaded_file.name}` was already loaded on {entry['ingested_at']:%Y-%m-%d %H:%M} "
+                f"(as `{entry['file_name']}`, {entry['row_count']} rows) and is skipped."
+            )
+        else:
+            new_files.append(uploaded_file)
+    return new_files